@@ -1,23 +1,69 @@
+import time
+
+_import_started = time.perf_counter()
+
+import contextvars
 import chainlit as cl
-from main import crew as main_crew, rate_limit_guard  # Import the main crew object and rate limiter
-from landing_zone import landing_zone_crew  # Import the landing zone crew object
-from newdb import new_db_crew  # Import the new database crew object
-from ml_checks import ml_crew  # Import the ML checks crew object
+from scheduler import run_workflows
+from crews import kickoff_crew, preload_crews, check_import_budget  # Crews are imported on first use
+from config import rate_limiter  # Shared LLM rate limiter
+from engines import pool_stats, describe_pool
+import config
+import tracing
+
+# Workflows each workflow waits for. Validation may apply fixes, so it waits for the landing zone
+# to export the source data as it was; the new database copies it after validation. The ML checks
+# only read the source database and need neither.
+WORKFLOW_DEPENDENCIES = {
+    "landing_zone": [],
+    "validation": ["landing_zone"],
+    "ml_checks": [],
+    "new_db": ["validation"],
+}
 
 @cl.on_message
 async def main(message: cl.Message):
-    """Handle user messages and trigger the workflows sequentially."""
-    await start_landing_zone_workflow()
-    await run_validation_workflow(message.content)
-    await run_ml_checks_workflow()
-    await start_new_db_workflow()
+    """Handle user messages and run the workflows concurrently, respecting their dependencies."""
+    with tracing.span("chat message", "run", collect=True, query=message.content[:200]) as run:
+        await run_workflows(
+            {
+                "landing_zone": start_landing_zone_workflow,
+                "validation": lambda: run_validation_workflow(message.content),
+                "ml_checks": run_ml_checks_workflow,
+                "new_db": start_new_db_workflow,
+            },
+            WORKFLOW_DEPENDENCIES,
+        )
+    await show_timing_summary(run)
+    await cl.Message(content="🎉 All workflows completed successfully!").send()
+
+@cl.step(type="tool", name="Timing Summary")
+async def show_timing_summary(run: tracing.Span):
+    """Show where the run spent its time, from the tracing spans, and how the caches and connection pools did."""
+    from tools import cache_stats  # Imported by the crews by now
+
+    cache = cache_stats()
+    lines = [
+        tracing.summarize(run.trace_id, run),
+        "",
+        f"**Tool result cache (since startup):** {cache['hits']} hits, {cache['misses']} misses "
+        f"({cache['hit_rate']:.0%} hit rate), {cache['size']} entries",
+    ]
+    pools = pool_stats()
+    if pools:
+        lines += ["", "**Connection pools:**"] + [f"- {url}: {describe_pool(entry)}" for url, entry in pools.items()]
+    return "\n".join(lines)
+
+async def _kickoff(*args):
+    """Runs `kickoff_crew` on a worker thread, in a copy of this task's context so its spans nest under the run."""
+    return await cl.make_async(contextvars.copy_context().run)(kickoff_crew, *args)
 
 @cl.step(type="run", name="Data Landing Zone Workflow")
 async def start_landing_zone_workflow():
     """Run the Data Landing Zone Workflow."""
     await cl.Message(content="🚀 Starting Data Landing Zone Creation...").send()
     try:
-        result = landing_zone_crew.kickoff()
+        result = await _kickoff("landing_zone")
         await cl.Message(content=f"✅ Data Landing Zone Creation Completed Successfully!\n\n{result}").send()
     except Exception as e:
         await cl.Message(content=f"❌ Error in Data Landing Zone Creation: {str(e)}").send()
@@ -28,14 +74,14 @@ async def run_validation_workflow(human_query: str):
     """Run the main validation workflow after receiving user input."""
 
     try:
-        async_function = cl.make_async(main_crew.kickoff)
-        result = await async_function({"query": human_query})
+        result = await _kickoff("main", {"query": human_query})
         await cl.Message(content=f"✅ Database Validation Completed Successfully!\n\n{result}").send()
     except Exception as e:
         await cl.Message(content=f"❌ Error in Main Workflow: {str(e)}").send()
-        rate_limit_guard()  # Retry on failure
+        if not await rate_limiter.backoff_async(e):  # Retry transient failures only
+            return
         try:
-            result = main_crew.kickoff(inputs={"query": human_query})
+            result = await _kickoff("main", {"query": human_query})
             await cl.Message(content=f"✅ Database Validation Completed Successfully After Retry!\n\n{result}").send()
         except Exception as retry_error:
             await cl.Message(content=f"❌ Retry Failed for Main Workflow: {str(retry_error)}").send()
@@ -47,13 +93,14 @@ async def run_ml_checks_workflow():
     """Run the Machine Learning Checks Workflow."""
     await cl.Message(content="🚀 Starting Machine Learning Checks...").send()
     try:
-        result = ml_crew.kickoff()
+        result = await _kickoff("ml_checks")
         await cl.Message(content=f"✅ Machine Learning Checks Completed Successfully!\n\n{result}").send()
     except Exception as e:
         await cl.Message(content=f"❌ Error in Machine Learning Checks: {str(e)}").send()
-        rate_limit_guard()  # Retry on failure
+        if not await rate_limiter.backoff_async(e):  # Retry transient failures only
+            return
         try:
-            result = ml_crew.kickoff()
+            result = await _kickoff("ml_checks")
             await cl.Message(content=f"✅ Machine Learning Checks Completed Successfully After Retry!\n\n{result}").send()
         except Exception as retry_error:
             await cl.Message(content=f"❌ Retry Failed for Machine Learning Checks: {str(retry_error)}").send()
@@ -65,18 +112,21 @@ async def start_new_db_workflow():
     """Run the New Database Creation Workflow."""
     await cl.Message(content="🚀 Starting New Database Creation...").send()
     try:
-        result = new_db_crew.kickoff()
+        result = await _kickoff("new_db")
         await cl.Message(content=f"✅ New Database Creation Completed Successfully!\n\n{result}").send()
     except Exception as e:
         await cl.Message(content=f"❌ Error in New Database Creation: {str(e)}").send()
-        rate_limit_guard()  
+        if not await rate_limiter.backoff_async(e):  # Retry transient failures only
+            return
         try:
-            result = new_db_crew.kickoff()
+            result = await _kickoff("new_db")
             await cl.Message(content=f"✅ New Database Creation Completed Successfully After Retry!\n\n{result}").send()
         except Exception as retry_error:
             await cl.Message(content=f"❌ Retry Failed for New Database Creation: {str(retry_error)}").send()
 
-    await cl.Message(content="🎉 All workflows completed successfully!").send()
+if not config.settings.fast_start:
+    preload_crews()
+check_import_budget("app.py", _import_started)
 
 if __name__ == '__main__':
     while True:
@@ -0,0 +1,207 @@
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.engine import make_url
+from crews import kickoff_crew
+from csv_store import CSV_TABLES, load_csv_files, store_path, database_url, remove_store
+from engines import dispose_engine, pool_stats, describe_pool
+import config
+import tracing
+
+# Pipeline stages and the crew each one runs, in dependency order: the copy of the database
+# comes after its validation, as in the chat app
+STAGES = {
+    "landing_zone": "landing_zone",
+    "validation": "main",
+    "ml_checks": "ml_checks",
+    "new_db": "new_db",
+}
+# A CSV metadata bundle describes a database without its data: only the validation applies
+CSV_STAGES = ("validation",)
+
+DEFAULT_QUERY = "Validate the database: data quality, schema relationships and the fixes needed."
+
+
+def _target_name(target: str) -> str:
+    """Short display name of a target: the database name of a URI, or the folder of a CSV bundle."""
+    if os.path.isdir(target):
+        return os.path.basename(os.path.normpath(target))
+    return make_url(target).database or target
+
+
+def _run_stage(stage: str, inputs: dict, url: str) -> tuple:
+    """
+    Runs one stage for one database, retrying once after a transient LLM error.
+
+    Returns:
+        tuple: Status ("ok" or "failed"), the crew output or error message, and seconds spent.
+    """
+    started = time.perf_counter()
+    try:
+        output = kickoff_crew(STAGES[stage], inputs, url)
+        return "ok", str(output), time.perf_counter() - started
+    except Exception as e:
+        if not config.rate_limiter.backoff(e):  # Retry transient failures only
+            return "failed", str(e), time.perf_counter() - started
+        try:
+            output = kickoff_crew(STAGES[stage], inputs, url)
+            return "ok", str(output), time.perf_counter() - started
+        except Exception as retry_error:
+            return "failed", str(retry_error), time.perf_counter() - started
+
+
+def run_target(target: str, stages: list = None, query: str = DEFAULT_QUERY) -> dict:
+    """
+    Runs the pipeline stages for one database URI or CSV metadata bundle, one stage after the other.
+
+    The crews' tools are bound to the target (see `crews.kickoff_crew`), so the target gets its
+    own pooled engine, closed when its run ends. A CSV bundle is a folder holding the files of
+    `CSV_TABLES`; it is loaded into a temporary SQLite store and only validated.
+
+    Returns:
+        dict: The target, its status, seconds spent, one `(status, output, seconds)` per stage and
+            its connection pool statistics (see `engines.pool_stats`).
+    """
+    name = _target_name(target)
+    result = {"target": name, "status": "ok", "seconds": 0.0, "stages": {}}
+    started = time.perf_counter()
+    store = None
+    url = None
+    try:
+        if os.path.isdir(target):
+            store = store_path(f"batch-{os.getpid()}-{threading.get_ident()}")
+            files = {file_name: os.path.join(target, file_name) for file_name in CSV_TABLES}
+            missing = [file_name for file_name, path in files.items() if not os.path.exists(path)]
+            if missing:
+                raise FileNotFoundError(f"missing {', '.join(missing)}")
+            load_csv_files(files, store)
+            url = database_url(store)
+            stages = [stage for stage in STAGES if stage in (stages or STAGES) and stage in CSV_STAGES]
+        else:
+            url = target
+            stages = [stage for stage in STAGES if stage in (stages or STAGES)]
+
+        with tracing.span(f"batch {name}", "run", database=name):
+            for stage in stages:
+                # The copy of a database that failed validation is not worth making
+                if stage == "new_db" and result["stages"].get("validation", ("ok",))[0] != "ok":
+                    result["stages"][stage] = ("skipped", "validation failed", 0.0)
+                    continue
+                inputs = {"query": query} if stage == "validation" else None
+                result["stages"][stage] = _run_stage(stage, inputs, url)
+                if result["stages"][stage][0] != "ok":
+                    result["status"] = "failed"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    finally:
+        if url:
+            # Read before the engine is disposed, which drops its metrics
+            result["pool"] = pool_stats().get(make_url(url).render_as_string(hide_password=True))
+        if store:
+            remove_store(store)
+        elif not os.path.isdir(target):
+            dispose_engine(target)
+        result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def run_batch(targets: list, stages: list = None, max_workers: int = None, query: str = DEFAULT_QUERY) -> list:
+    """
+    Runs the pipeline for many databases concurrently, on a pool of `batch_max_workers` threads.
+    Every run shares the process-wide LLM rate limiter, so more workers do not mean more
+    requests per minute than the provider allows.
+
+    Args:
+        targets (list): Database URIs and CSV metadata bundle folders.
+        stages (list): Stages to run, keys of `STAGES`. Defaults to all of them.
+        max_workers (int): Databases processed at once. Defaults to `batch_max_workers`.
+        query (str): Request given to the validation crew.
+
+    Returns:
+        list: One result per target, in the order given (see `run_target`).
+    """
+    workers = max(1, min(max_workers or config.settings.batch_max_workers, len(targets) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        return list(executor.map(lambda target: run_target(target, stages, query), targets))
+
+
+def kickoff_each(crew, inputs: list, max_workers: int = None) -> list:
+    """
+    Runs a crew once per input on a bounded thread pool, like `Crew.kickoff_for_each` but
+    concurrently. Each run uses its own copy of the crew.
+
+    Returns:
+        list: The crew outputs, in the order of `inputs`.
+    """
+    workers = max(1, min(max_workers or config.settings.batch_max_workers, len(inputs) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        return list(executor.map(lambda item: crew.copy().kickoff(inputs=item), inputs))
+
+
+def batch_report(results: list, wall_clock: float = None) -> str:
+    """
+    Summarizes a batch: status and seconds per database and stage, and totals.
+
+    Args:
+        results (list): Results of `run_batch`.
+        wall_clock (float): Seconds the whole batch took, to compare with the summed run times.
+
+    Returns:
+        str: A markdown report.
+    """
+    stages = [stage for stage in STAGES if any(stage in result["stages"] for result in results)]
+    lines = [
+        "| Database | Status | Total (s) | " + " | ".join(f"{stage} (s)" for stage in stages) + " |",
+        "|---|---|---|" + "---|" * len(stages),
+    ]
+    for result in results:
+        cells = []
+        for stage in stages:
+            if stage not in result["stages"]:
+                cells.append("-")
+            else:
+                status, output, seconds = result["stages"][stage]
+                cells.append({"ok": f"{seconds:.1f}", "skipped": "skipped"}.get(status, f"❌ {seconds:.1f}"))
+        status = "✅" if result["status"] == "ok" else f"❌ {result.get('error', 'failed')}"
+        lines.append(f"| {result['target']} | {status} | {result['seconds']:.1f} | " + " | ".join(cells) + " |")
+
+    failed = [result for result in results if result["status"] != "ok"]
+    summary = f"Processed {len(results)} databases: {len(results) - len(failed)} succeeded, {len(failed)} failed."
+    total = sum(result["seconds"] for result in results)
+    if wall_clock is not None:
+        summary += f" Wall-clock {wall_clock:.1f}s for {total:.1f}s of runs."
+
+    pools = [f"- {result['target']}: {describe_pool(result['pool'])}" for result in results if result.get("pool")]
+
+    details = []
+    for result in failed:
+        for stage, (status, output, seconds) in result["stages"].items():
+            if status == "failed":
+                details.append(f"- {result['target']} / {stage}: {output[:300]}")
+    return "\n".join(
+        [summary, ""] + lines
+        + (["", "**Connection pools:**"] + pools if pools else [])
+        + (["", "**Failures:**"] + details if details else [])
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the validation pipeline for many databases concurrently.")
+    parser.add_argument("targets", nargs="+", help="Database URIs or folders of CSV metadata files")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Stages to run (default: all)")
+    parser.add_argument("--workers", type=int, help="Databases processed at once (default: batch_max_workers)")
+    parser.add_argument("--query", default=DEFAULT_QUERY, help="Request given to the validation crew")
+    parser.add_argument("--report", help="Also write the markdown report to this file")
+    arguments = parser.parse_args()
+
+    print(f"🚀 Starting batch of {len(arguments.targets)} databases...")
+    started = time.perf_counter()
+    results = run_batch(arguments.targets, arguments.stages, arguments.workers, arguments.query)
+    report = batch_report(results, time.perf_counter() - started)
+    if arguments.report:
+        with open(arguments.report, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+    print(report)
@@ -0,0 +1,244 @@
+import re
+import time
+from decimal import Decimal
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+import config
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import ParseError
+except ImportError:  # Optional: without sqlglot, queries on buffering drivers are bounded by the timeout only
+    sqlglot = None
+
+# SQLAlchemy dialect names that sqlglot spells differently
+SQLGLOT_DIALECTS = {"postgresql": "postgres"}
+
+# Distinct values tracked per column before the count is reported as a lower bound
+MAX_DISTINCT = 10_000
+# Characters of a value shown in the column statistics
+MAX_VALUE_CHARS = 40
+
+
+class ColumnStats:
+    """Running statistics of one result column, updated batch by batch in bounded memory."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        self.total = 0
+        self.numeric = True
+        self.distinct = set()
+        self.distinct_capped = False
+
+    def update(self, values: list):
+        self.count += len(values)
+        present = [value for value in values if value is not None]
+        self.nulls += len(values) - len(present)
+        if not present:
+            return
+
+        try:
+            low, high = min(present), max(present)
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+        except TypeError:  # Mixed types: compare as text
+            low, high = min(map(str, present)), max(map(str, present))
+            self.minimum = low if self.minimum is None else min(str(self.minimum), low)
+            self.maximum = high if self.maximum is None else max(str(self.maximum), high)
+
+        if self.numeric and all(isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) for value in present):
+            self.total += sum(present)
+        else:
+            self.numeric = False
+
+        if not self.distinct_capped:
+            try:
+                self.distinct.update(present)
+            except TypeError:  # Unhashable values, e.g. JSON documents
+                self.distinct_capped = True
+            if len(self.distinct) > MAX_DISTINCT:
+                self.distinct_capped = True
+            if self.distinct_capped:
+                self.distinct = set()
+
+    def describe(self) -> str:
+        parts = [f"{self.count - self.nulls} non-null", f"{self.nulls} null"]
+        if self.distinct_capped:
+            parts.append(f">{MAX_DISTINCT} distinct")
+        else:
+            parts.append(f"{len(self.distinct)} distinct")
+        if self.minimum is not None:
+            parts.append(f"min {_clip(self.minimum)}, max {_clip(self.maximum)}")
+        if self.numeric and self.count > self.nulls:
+            parts.append(f"mean {float(self.total) / (self.count - self.nulls):.6g}")
+        return f"- {self.name}: " + ", ".join(parts)
+
+
+def _clip(value) -> str:
+    text_value = repr(value)
+    return text_value if len(text_value) <= MAX_VALUE_CHARS else text_value[:MAX_VALUE_CHARS - 3] + "..."
+
+
+def _row_bytes(row) -> int:
+    """Approximate size of a row: the length of text and binary values, 8 bytes for anything else."""
+    return sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row)
+
+
+def _set_timeout(connection, seconds: float):
+    """
+    Sets a server-side statement timeout for the connection's current transaction. Returns a
+    function undoing it, as the connection goes back to the pool afterwards.
+    """
+    milliseconds = max(1, int(seconds * 1000))
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        # Applies to SELECT statements only; other statements are bounded by the client-side check
+        connection.exec_driver_sql(f"SET SESSION MAX_EXECUTION_TIME = {milliseconds}")
+        return lambda: connection.exec_driver_sql("SET SESSION MAX_EXECUTION_TIME = 0")
+    if dialect == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {milliseconds}")
+        return lambda: None
+    if dialect == "sqlite":
+        deadline = time.monotonic() + seconds
+        driver_connection = connection.connection.driver_connection
+        driver_connection.set_progress_handler(lambda: int(time.monotonic() > deadline), 10_000)
+        return lambda: driver_connection.set_progress_handler(None, 0)
+    return lambda: None
+
+
+def _bounded_statement(connection, sql_query: str, is_select: bool, max_rows: int) -> str:
+    """
+    Drivers without server-side cursors (e.g. mysql-connector) buffer the whole result on
+    `execute`, so for them a query gets a `LIMIT` of one row past `max_rows`, unless it already
+    has one at most that large. The query is not wrapped in a derived table, which MySQL rejects
+    when columns share a name (`SELECT *` over a join), nor regenerated: the LIMIT is appended
+    on its own line, after any trailing comment. Queries sqlglot cannot analyse are left
+    unchanged and bounded by the statement timeout only.
+    """
+    if not is_select or connection.dialect.supports_server_side_cursors or sqlglot is None:
+        return sql_query
+    dialect = SQLGLOT_DIALECTS.get(connection.dialect.name, connection.dialect.name)
+    try:
+        statements = [statement for statement in sqlglot.parse(sql_query, read=dialect) if statement is not None]
+    except ParseError:
+        return sql_query
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return sql_query
+    statement = statements[0]
+    if any(statement.args.get(name) for name in ("locks", "into", "offset")):
+        return sql_query
+
+    limit = statement.args.get("limit")
+    if limit is None:
+        return re.sub(r"\s*;\s*$", "", sql_query) + f"\nLIMIT {max_rows + 1}"
+    value = limit.expression
+    if isinstance(value, exp.Literal) and value.is_int and int(value.this) > max_rows + 1:
+        # Lowering an existing LIMIT means rewriting the query
+        return statement.limit(max_rows + 1).sql(dialect=dialect)
+    return sql_query
+
+
+def execute_bounded(
+    engine,
+    sql_query: str,
+    is_select: bool = True,
+    preview_rows: int = None,
+    preview_bytes: int = None,
+    max_rows: int = None,
+    max_bytes: int = None,
+    timeout: float = None,
+) -> str:
+    """
+    Runs a statement and streams its result through a server-side cursor, keeping only a short
+    preview and running column statistics, so memory and output size stay bounded whatever the
+    query returns. Reading stops at the row, byte or time limit; totals are exact otherwise.
+
+    Args:
+        engine: Engine of the database to query.
+        sql_query (str): Statement to run.
+        is_select (bool): Whether the statement is a plain query that may be wrapped in a LIMIT.
+        preview_rows (int): Rows shown in the preview. Defaults to `sql_preview_rows`.
+        preview_bytes (int): Characters of rows shown in the preview. Defaults to `sql_preview_bytes`.
+        max_rows (int): Rows read before stopping. Defaults to `sql_max_rows`.
+        max_bytes (int): Approximate bytes read before stopping. Defaults to `sql_max_bytes`.
+        timeout (float): Seconds the statement may take, enforced by the server where supported
+            and between batches. Defaults to `sql_timeout`.
+
+    Returns:
+        str: The preview, row totals and column statistics, or the number of rows affected.
+    """
+    settings = config.settings
+    preview_rows = settings.sql_preview_rows if preview_rows is None else preview_rows
+    preview_bytes = settings.sql_preview_bytes if preview_bytes is None else preview_bytes
+    max_rows = settings.sql_max_rows if max_rows is None else max_rows
+    max_bytes = settings.sql_max_bytes if max_bytes is None else max_bytes
+    timeout = settings.sql_timeout if timeout is None else timeout
+
+    started = time.monotonic()
+    with engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True, max_row_buffer=settings.sql_stream_batch_size)
+        reset_timeout = _set_timeout(connection, timeout)
+        stopped = None
+        try:
+            result = connection.execute(text(_bounded_statement(connection, sql_query, is_select, max_rows)))
+            if not result.returns_rows:
+                connection.commit()
+                return f"{result.rowcount} rows affected"
+
+            columns = list(result.keys())
+            stats = [ColumnStats(name) for name in columns]
+            preview = []
+            shown_bytes = 0
+            rows = 0
+            read_bytes = 0
+            preview_full = preview_rows <= 0
+            for batch in result.partitions(settings.sql_stream_batch_size):
+                if len(batch) > max_rows - rows:
+                    batch = batch[:max_rows - rows]
+                    stopped = f"row limit of {max_rows}"
+                for row in batch:
+                    if not preview_full:
+                        line = str(tuple(row))
+                        if shown_bytes + len(line) <= preview_bytes:
+                            preview.append(line)
+                            shown_bytes += len(line)
+                        preview_full = len(preview) >= preview_rows or shown_bytes + len(line) > preview_bytes
+                    read_bytes += _row_bytes(row)
+                for column, stat in enumerate(stats):
+                    stat.update([row[column] for row in batch])
+                rows += len(batch)
+
+                if not stopped and read_bytes >= max_bytes:
+                    stopped = f"byte limit of {max_bytes}"
+                if not stopped and time.monotonic() - started > timeout:
+                    stopped = f"time limit of {timeout}s"
+                if stopped:
+                    break
+
+            if stopped:
+                # Drop the connection rather than let the driver drain the rest of the result
+                connection.invalidate()
+            else:
+                connection.rollback()
+        except DBAPIError as e:
+            if time.monotonic() - started > timeout:
+                return f"Error: query exceeded the time limit of {timeout}s: {e.orig}"
+            raise
+        finally:
+            if not connection.invalidated:
+                reset_timeout()
+
+    lines = [f"Columns: {', '.join(columns)}"] + preview
+    if stopped:
+        lines.append(f"-- Showing {len(preview)} rows. Stopped at the {stopped} after {rows} rows ({time.monotonic() - started:.1f}s); totals are lower bounds, add filters or a LIMIT.")
+    else:
+        lines.append(f"-- Showing {len(preview)} of {rows} rows ({time.monotonic() - started:.1f}s).")
+    if rows:
+        lines.append("Column stats:")
+        lines += [stat.describe() for stat in stats]
+    return "\n".join(lines)
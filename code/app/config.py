@@ -1,9 +1,8 @@
 import os
+import threading
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from langchain_community.utilities.sql_database import SQLDatabase
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from crewai import LLM
+from rate_limiter import RateLimiter
 
 # Explicitly load .env for debugging
 load_dotenv(".env")
@@ -16,16 +15,142 @@ class Settings(BaseSettings):
     azure_api_version: str
     openai_api_key: str
 
+    # Landing zone export
+    landing_zone_chunk_size: int = 50_000
+    landing_zone_max_workers: int = 4
+    landing_zone_format: str = "csv"
+    landing_zone_compression: str = "zstd"
+    landing_zone_partition_min_rows: int = 1_000_000
+    landing_zone_incremental: bool = True
+    landing_zone_watermark_columns: list[str] = ["updated_at", "last_update", "modified_at"]
+
+    # Database copy
+    copy_max_workers: int = 4
+    copy_batch_size: int = 10_000
+
+    # Outlier detection
+    outlier_sample_size: int = 100_000
+    outlier_chunk_size: int = 50_000
+    outlier_contamination: float = 0.01
+    outlier_n_jobs: int = -1
+    outlier_model_cache_dir: str = ".model_cache"
+    outlier_model_cache_size: int = 32
+
+    # Schema reflection
+    schema_snapshot_ttl: int = 300
+    schema_digest_token_budget: int = 2_000
+
+    # Integrity checks
+    integrity_max_workers: int = 4
+
+    # Data profiling
+    profiling_max_workers: int = 4
+
+    # Tool result cache
+    tool_cache_ttl: int = 300
+    tool_cache_size: int = 256
+
+    # LLM response cache: "off", "read_write" or "replay"
+    llm_cache_mode: str = "read_write"
+    llm_cache_path: str = ".llm_cache.sqlite"
+    llm_cache_max_bytes: int = 200_000_000
+
+    # LLM rate limiting, shared by every crew in the process (0 disables a limit)
+    llm_requests_per_minute: int = 30
+    llm_tokens_per_minute: int = 30_000
+    llm_max_retries: int = 5
+    llm_backoff_base: float = 2.0
+    llm_backoff_max: float = 60.0
+
+    # execute_sql: results are streamed; only a preview and column statistics are returned
+    sql_preview_rows: int = 20
+    sql_preview_bytes: int = 4_000
+    sql_max_rows: int = 1_000_000
+    sql_max_bytes: int = 200_000_000
+    sql_timeout: float = 30.0
+    sql_stream_batch_size: int = 1_000
+
+    # Fix executor: large UPDATEs and DELETEs run in primary-key ranges of this many rows
+    fix_chunk_rows: int = 5_000
+
+    # Database connection pools, one per database URL shared by every tool
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1_800
+    db_pool_pre_ping: bool = True
+
+    # Crew execution: tasks of the main crew that may run at once (1 runs them one by one)
+    crew_max_parallel_tasks: int = 2
+
+    # Batch runs over many databases: databases processed at once, sharing the LLM rate limiter
+    batch_max_workers: int = 4
+
+    # Uploaded CSV metadata: one SQLite store per chat session
+    csv_store_dir: str = ".csv_sessions"
+
+    # Tracing: spans of runs, crews, tasks, tools, SQL statements and LLM calls, one JSON object per line
+    tracing_enabled: bool = True
+    trace_path: str = ".traces.jsonl"
+
+    # Startup: with fast_start, crews, engines and heavy libraries are loaded on first use
+    fast_start: bool = True
+    startup_import_budget: float = 0.5
+
     model_config = SettingsConfigDict(env_file="/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/app/.env", extra="ignore", )
 
 
 settings = Settings()
 
+DB_URI = settings.db_uri
 
-
-# Configure LLM
-llm = LLM(
-    model="openai/gpt-4o",  # or "gpt4O" depending on usage
-    temperature=0.7,
-    api_key=settings.openai_api_key,
+# One limiter for every LLM call made by the process
+rate_limiter = RateLimiter(
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_retries=settings.llm_max_retries,
+    backoff_base=settings.llm_backoff_base,
+    backoff_max=settings.llm_backoff_max,
 )
+
+_lazy_lock = threading.Lock()
+
+
+def _build_llm():
+    from llm_cache import CachedLLM  # Imports crewai, which is slow
+
+    # Configure LLM
+    return CachedLLM(
+        model="openai/gpt-4o",  # or "gpt4O" depending on usage
+        temperature=0.7,
+        api_key=settings.openai_api_key,
+        cache_path=settings.llm_cache_path,
+        cache_max_bytes=settings.llm_cache_max_bytes,
+        cache_mode=settings.llm_cache_mode,
+        rate_limiter=rate_limiter,
+    )
+
+
+def _build_db():
+    from langchain_community.utilities.sql_database import SQLDatabase  # Slow to import
+    from engines import get_engine
+
+    # LangChain view of the source database, on the shared engine
+    return SQLDatabase(get_engine(DB_URI))
+
+
+# Attributes built on first access instead of at import time
+_LAZY_ATTRIBUTES = {
+    "llm": _build_llm,
+    "db": _build_db,
+}
+
+
+def __getattr__(name: str):
+    """Builds expensive module attributes such as `llm` and `db` on first access and keeps them."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = _LAZY_ATTRIBUTES[name]()
+    return globals()[name]
@@ -0,0 +1,69 @@
+import importlib
+import time
+from sqlalchemy.engine import make_url
+from engines import bind_database
+import config
+import tracing
+
+# Crew name to the module and attribute defining it. Crew modules import crewai, pandas and
+# scikit-learn and load config.yaml, so they are only imported when a crew is first needed.
+CREWS = {
+    "main": ("main", "crew"),
+    "landing_zone": ("landing_zone", "landing_zone_crew"),
+    "new_db": ("newdb", "new_db_crew"),
+    "ml_checks": ("ml_checks", "ml_crew"),
+}
+
+
+def get_crew(name: str):
+    """Returns a crew, importing the module that defines it on first use, with task and tool tracing."""
+    module, attribute = CREWS[name]
+    crew = getattr(importlib.import_module(module), attribute)
+    tracing.instrument_crew(crew)
+    return crew
+
+
+def kickoff_crew(name: str, inputs: dict = None, database_url: str = None):
+    """
+    Runs a crew inside a tracing span. Blocking: call it from a worker thread in async code.
+
+    The crew is copied for each run, since a kickoff fills the inputs into the tasks and agents:
+    the shared crew keeps its templates and concurrent runs do not overwrite each other. The
+    inputs always include `database`, the name of the database the run works on.
+
+    Args:
+        name (str): Crew name, a key of `CREWS`.
+        inputs (dict): Crew inputs.
+        database_url (str): Database the crew's tools run against instead of `DB_URI`.
+    """
+    crew = get_crew(name).copy()
+    if database_url:
+        for agent in crew.agents:
+            agent.tools = [
+                tool.model_copy(update={"func": bind_database(tool.func, database_url)}) if hasattr(tool, "func") else tool
+                for tool in agent.tools or []
+            ]
+    inputs = {"database": make_url(database_url or config.DB_URI).database, **(inputs or {})}
+    with tracing.span(name, "crew", database_url=database_url) as span:
+        tracing.bind_crew(crew, span)
+        return crew.kickoff(inputs=inputs)
+
+
+def preload_crews():
+    """Imports every crew module up front, for when startup time matters less than the first response."""
+    for name in CREWS:
+        get_crew(name)
+
+
+def check_import_budget(module: str, started: float) -> float:
+    """
+    Measures how long a module took to import since `started` (a `time.perf_counter()` value)
+    and warns when it exceeds `startup_import_budget`.
+
+    Returns:
+        float: The import time in seconds.
+    """
+    seconds = time.perf_counter() - started
+    if seconds > config.settings.startup_import_budget:
+        print(f"⚠ {module} took {seconds:.2f}s to import, over the {config.settings.startup_import_budget}s startup budget")
+    return seconds
@@ -1,6 +1,12 @@
+import time
+
+_import_started = time.perf_counter()
+
 import chainlit as cl
-import pandas as pd
-from main import crew as main_crew, rate_limit_guard  # Import the main crew object and rate limiter
+from crews import kickoff_crew, preload_crews, check_import_budget  # Crews are imported on first use
+from config import rate_limiter  # Shared LLM rate limiter
+from csv_store import CSV_TABLES, load_csv_files, store_path, database_url, remove_store
+import config
 
 
 @cl.on_message
@@ -18,7 +24,7 @@ async def upload_and_process_files():
     uploaded_files = await cl.AskFileMessage(content="Please upload the required files.", accept=["text/csv", "application/pdf"]).send()
 
     # Validate uploaded files
-    required_files = {"tables.csv", "table_schema_structure.csv", "foreign_key_names.csv", "primary_key_names.csv"}
+    required_files = set(CSV_TABLES)
     uploaded_files_dict = {file.name: file for file in uploaded_files}
     missing_files = required_files - uploaded_files_dict.keys()
 
@@ -27,47 +33,61 @@ async def upload_and_process_files():
         return
 
     try:
-        # Parse uploaded files
-        tables = pd.read_csv(uploaded_files_dict["tables.csv"].content)
-        schema_structure = pd.read_csv(uploaded_files_dict["table_schema_structure.csv"].content)
-        foreign_keys = pd.read_csv(uploaded_files_dict["foreign_key_names.csv"].content)
-        primary_keys = pd.read_csv(uploaded_files_dict["primary_key_names.csv"].content)
+        # Parse uploaded files into the session's SQLite store, off the event loop
+        path = store_path(cl.user_session.get("id"))
+        files = {name: uploaded_files_dict[name].path for name in required_files}
+        loaded = await cl.make_async(load_csv_files)(files, path)
+        cl.user_session.set("csv_store", path)
 
         # Process the data and provide feedback
-        await cl.Message(content=f"✅ Files successfully uploaded and processed! Starting validation workflows...").send()
+        summary = ", ".join(f"`{table}` ({rows} rows)" for table, rows in loaded.items())
+        await cl.Message(content=f"✅ Files successfully uploaded and processed into {summary}! Starting validation workflows...").send()
 
-        # Run the workflows with extracted metadata
-        await run_workflows(tables, schema_structure, foreign_keys, primary_keys)
+        # Run the workflows against the store
+        await run_workflows(path, loaded)
 
     except Exception as e:
         await cl.Message(content=f"❌ Error processing uploaded files: {str(e)}").send()
 
 
-async def run_workflows(tables, schema_structure, foreign_keys, primary_keys):
+async def run_workflows(path: str, loaded: dict):
     """Run the main validation and database workflows."""
-    await run_validation_workflow(tables, schema_structure, foreign_keys, primary_keys)
+    await run_validation_workflow(path, loaded)
 
 
 @cl.step(type="run", name="Main Validation Workflow")
-async def run_validation_workflow(tables, schema_structure, foreign_keys, primary_keys):
-    """Run the main validation workflow using metadata from uploaded files."""
+async def run_validation_workflow(path: str, loaded: dict):
+    """Run the main validation workflow, with the agents' SQL tools querying the session store."""
     await cl.Message(content="💬 Processing the metadata for database validation...").send()
+    url = database_url(path)
     try:
-        # Example: Passing extracted metadata as inputs
+        # Only the table names go into the inputs; agents read the metadata through their tools
         inputs = {
-            "tables": tables.to_dict(),
-            "schema_structure": schema_structure.to_dict(),
-            "foreign_keys": foreign_keys.to_dict(),
-            "primary_keys": primary_keys.to_dict(),
+            "query": "Validate the database described by the uploaded CSV metadata.",
+            "tables": ", ".join(loaded),
         }
-        result = main_crew.kickoff(inputs=inputs)
+        result = await cl.make_async(kickoff_crew)("main", inputs, url)
         await cl.Message(content=f"✅ Main Validation Workflow Completed Successfully!\n\n{result}").send()
     except Exception as e:
         await cl.Message(content=f"❌ Error in Main Validation Workflow: {str(e)}").send()
-        rate_limit_guard()  # Retry on failure
+        if not await rate_limiter.backoff_async(e):  # Retry transient failures only
+            return
         try:
-            result = main_crew.kickoff(inputs=inputs)
+            result = await cl.make_async(kickoff_crew)("main", inputs, url)
             await cl.Message(content=f"✅ Validation Workflow Completed Successfully After Retry!\n\n{result}").send()
         except Exception as retry_error:
             await cl.Message(content=f"❌ Retry Failed for Validation Workflow: {str(retry_error)}").send()
             return  # Stop further workflows if Validation fails
+
+
+@cl.on_chat_end
+async def remove_session_store():
+    """Delete the session's CSV store when the chat ends."""
+    path = cl.user_session.get("csv_store")
+    if path:
+        await cl.make_async(remove_store)(path)
+
+
+if not config.settings.fast_start:
+    preload_crews()
+check_import_budget("csv_app.py", _import_started)
@@ -2,6 +2,8 @@ import pandas as pd
 from crewai import Agent, Task, Crew
 from crewai_tools import tool
 from crewai import LLM
+from batch import kickoff_each
+from schema_checks import check_schema_metadata
 import config
 
 # Load LLM
@@ -39,7 +41,8 @@ def detect_outliers_with_isolation_forest(data: dict) -> str:
 @tool("validate_schema")
 def validate_schema(data: dict) -> str:
     """
-    Validates schema relationships using the provided schema metadata.
+    Validates schema relationships using the provided schema metadata: foreign keys pointing at
+    missing tables or columns, primary key coverage and foreign key / primary key type mismatches.
 
     Args:
         data: Dictionary containing schema metadata.
@@ -48,24 +51,9 @@ def validate_schema(data: dict) -> str:
         str: Summary of schema validation.
     """
     try:
-        schema_df = data.get("schema_structure")
-        foreign_keys_df = data.get("foreign_keys")
-        primary_keys_df = data.get("primary_keys")
-
-        validation_results = []
-
-        # Check for missing foreign keys
-        for _, row in schema_df.iterrows():
-            table = row['table_name']
-            if table not in foreign_keys_df['table_name'].values:
-                validation_results.append(f"⚠ Table '{table}' has no foreign keys.")
-
-        # Check for orphaned rows or missing references
-        for _, fk in foreign_keys_df.iterrows():
-            child_table = fk['table_name']
-            parent_table = fk['referred_table']
-            validation_results.append(f"Checked foreign key from '{child_table}' to '{parent_table}'.")
-
+        validation_results = check_schema_metadata(
+            data.get("schema_structure"), data.get("foreign_keys"), data.get("primary_keys")
+        )
         return "\n".join(validation_results) if validation_results else "✅ Schema validation passed."
     except Exception as e:
         return f"❌ Error during schema validation: {str(e)}"
@@ -106,28 +94,35 @@ analysis_crew = Crew(
     respect_context_window=True,
 )
 
-# Load CSV Files as Inputs
-datasets = []
-try:
-    # Read CSV files
-    tables_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/tables.csv")
-    schema_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/table_schema_structure.csv")
-    foreign_keys_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/foreign_keynames.csv")
-    primary_keys_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/primary_key_names.csv")
-
-    # Add to datasets
-    datasets.append({
-        "table_data": tables_df,
-        "schema_structure": schema_df,
-        "foreign_keys": foreign_keys_df,
-        "primary_keys": primary_keys_df,
-    })
-except Exception as e:
-    print(f"❌ Error loading CSV files: {str(e)}")
-
-# Execute the pipeline
-if datasets:
-    result = analysis_crew.kickoff_for_each(inputs=datasets)
-    print(result)
-else:
-    print("❌ No datasets available for processing.")
+
+def load_datasets() -> list:
+    """Loads the CSV metadata files as crew inputs."""
+    datasets = []
+    try:
+        # Read CSV files
+        tables_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/tables.csv")
+        schema_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/table_schema_structure.csv")
+        foreign_keys_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/foreign_keynames.csv")
+        primary_keys_df = pd.read_csv("/Users/Shared/Work/Workspace/Python/Workspace/AgenticAI/code/Data/CSV/primary_key_names.csv")
+
+        # Add to datasets
+        datasets.append({
+            "table_data": tables_df,
+            "schema_structure": schema_df,
+            "foreign_keys": foreign_keys_df,
+            "primary_keys": primary_keys_df,
+        })
+    except Exception as e:
+        print(f"❌ Error loading CSV files: {str(e)}")
+    return datasets
+
+
+# Execute the pipeline when run as a script, never on import
+if __name__ == "__main__":
+    datasets = load_datasets()
+    if datasets:
+        # Datasets are analysed concurrently, on a bounded pool
+        result = kickoff_each(analysis_crew, datasets)
+        print(result)
+    else:
+        print("❌ No datasets available for processing.")
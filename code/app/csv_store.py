@@ -0,0 +1,118 @@
+import os
+import re
+import sqlite3
+from engines import get_engine, dispose_engine
+from schema_snapshot import invalidate_schema_snapshot
+from tools import result_cache
+import config
+
+# Uploaded metadata files and the store tables they are loaded into
+CSV_TABLES = {
+    "tables.csv": "tables",
+    "table_schema_structure.csv": "schema_structure",
+    "foreign_key_names.csv": "foreign_keys",
+    "primary_key_names.csv": "primary_keys",
+}
+
+INSERT_BATCH_SIZE = 10_000
+
+
+def _sqlite_type(arrow_type) -> str:
+    """Maps an Arrow type to a SQLite column affinity."""
+    import pyarrow.types as types
+
+    if types.is_boolean(arrow_type) or types.is_integer(arrow_type):
+        return "INTEGER"
+    if types.is_floating(arrow_type) or types.is_decimal(arrow_type):
+        return "REAL"
+    return "TEXT"
+
+
+def _column_name(name: str) -> str:
+    return re.sub(r"\W+", "_", name.strip()).strip("_").lower() or "column"
+
+
+def _column_names(names: list) -> list:
+    """Normalizes column names, suffixing `_2`, `_3`, ... to headers that normalize alike, e.g. "Order Id" and "order_id"."""
+    columns = []
+    for name in map(_column_name, names):
+        column, suffix = name, 2
+        while column in columns:
+            column, suffix = f"{name}_{suffix}", suffix + 1
+        columns.append(column)
+    return columns
+
+
+def _load_csv(connection, file_path: str, table: str) -> int:
+    """
+    Parses a CSV file with Arrow's multi-threaded reader and loads it into a SQLite table.
+
+    Returns:
+        int: Rows loaded.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    data = pa_csv.read_csv(file_path)
+    columns = _column_names(data.column_names)
+    definitions = ", ".join(f'"{name}" {_sqlite_type(field.type)}' for name, field in zip(columns, data.schema))
+    connection.execute(f'DROP TABLE IF EXISTS "{table}"')
+    connection.execute(f'CREATE TABLE "{table}" ({definitions})')
+
+    # Dates and timestamps are stored as ISO strings
+    for index, field in enumerate(data.schema):
+        if pa.types.is_temporal(field.type):
+            data = data.set_column(index, field.name, data.column(index).cast(pa.string()))
+
+    insert = f'INSERT INTO "{table}" VALUES ({", ".join("?" for _ in columns)})'
+    for batch in data.to_batches(max_chunksize=INSERT_BATCH_SIZE):
+        connection.executemany(insert, zip(*(column.to_pylist() for column in batch.columns)))
+    return data.num_rows
+
+
+def store_path(session_id: str) -> str:
+    """Path of the SQLite store of a chat session."""
+    return os.path.join(config.settings.csv_store_dir, f"{re.sub(r'[^A-Za-z0-9_-]', '_', session_id)}.sqlite")
+
+
+def load_csv_files(files: dict, path: str) -> dict:
+    """
+    Loads uploaded CSV metadata files into a local SQLite store, one table per file, so agents
+    can query them with the SQL tools instead of receiving their whole content in the prompt.
+
+    Args:
+        files (dict): Uploaded file name (a key of `CSV_TABLES`) to its path on disk.
+        path (str): Path of the SQLite store to create or replace.
+
+    Returns:
+        dict: Store table name to the number of rows loaded.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    loaded = {}
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            for file_name, file_path in files.items():
+                table = CSV_TABLES[file_name]
+                loaded[table] = _load_csv(connection, file_path, table)
+    finally:
+        connection.close()
+    # A reloaded store may hold other tables and rows than cached schema and query results
+    invalidate_schema_snapshot(get_engine(database_url(path)))
+    result_cache.clear()
+    return loaded
+
+
+def database_url(path: str) -> str:
+    """SQLAlchemy URL of a SQLite store."""
+    return f"sqlite:///{os.path.abspath(path)}"
+
+
+def remove_store(path: str):
+    """Closes the pooled connections of a store and deletes its file."""
+    url = database_url(path)
+    invalidate_schema_snapshot(get_engine(url))
+    dispose_engine(url)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,167 @@
+import contextvars
+import functools
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+import config
+import tracing
+
+
+class PoolMetrics:
+    """Checkout counters of one connection pool: wait times, timeouts and peak connections in use."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_in_use = 0
+        self._lock = threading.Lock()
+
+    def record(self, wait: float, in_use: int, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.peak_in_use = max(self.peak_in_use, in_use)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait / attempts, 2) if attempts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 2),
+                "peak_in_use": self.peak_in_use,
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """`QueuePool` that records how long each checkout waits for a free connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, self.checkedout(), timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+    def recreate(self):
+        # `Engine.dispose()` swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+# Database the tools of the current call run against, when not the default `DB_URI`
+_database_url = contextvars.ContextVar("database_url", default=None)
+
+
+def _registry_key(url) -> str:
+    return make_url(url).render_as_string(hide_password=False)
+
+
+def get_engine(url=None):
+    """
+    Returns the shared engine for a database URL, creating it on first use. Without a URL this
+    is the database bound by `bind_database`, or `DB_URI`.
+
+    Every tool reuses the same engine per URL, so connections are pooled process-wide. Pools are
+    sized by the `db_pool_*` settings, ping connections before handing them out and recycle them
+    before MySQL's `wait_timeout` closes them.
+    """
+    url = make_url(url or _database_url.get() or config.DB_URI)
+    key = _registry_key(url)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            if url.get_backend_name() == "sqlite":
+                # SQLite uses its own per-thread pools
+                engine = create_engine(url)
+            else:
+                engine = create_engine(
+                    url,
+                    poolclass=MeteredQueuePool,
+                    pool_size=config.settings.db_pool_size,
+                    max_overflow=config.settings.db_max_overflow,
+                    pool_timeout=config.settings.db_pool_timeout,
+                    pool_recycle=config.settings.db_pool_recycle,
+                    pool_pre_ping=config.settings.db_pool_pre_ping,
+                )
+                engine.pool.metrics = PoolMetrics()
+            tracing.instrument_engine(engine)
+            _engines[key] = engine
+        return engine
+
+
+def bind_database(function, url: str):
+    """
+    Wraps a function so that, while it runs, `get_engine()` without a URL returns the engine of
+    `url`. Used to point the database tools of a crew at another database, e.g. a session store.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _database_url.set(url)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _database_url.reset(token)
+    return wrapper
+
+
+def dispose_engine(url):
+    """Closes the pooled connections of an engine and removes it from the registry."""
+    with _engines_lock:
+        engine = _engines.pop(_registry_key(url), None)
+    if engine is not None:
+        engine.dispose()
+
+
+def pool_stats() -> dict:
+    """
+    Reports the connection pool of every registered engine, to size pools for concurrent sessions.
+
+    Returns:
+        dict: Database URL (password hidden) to pool size, connections in use, overflow and
+            checkout metrics (count, timeouts, average and maximum wait, peak in use).
+    """
+    with _engines_lock:
+        engines = list(_engines.values())
+    stats = {}
+    for engine in engines:
+        pool = engine.pool
+        entry = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({"size": pool.size(), "in_use": pool.checkedout(), "idle": pool.checkedin(), "overflow": pool.overflow()})
+        if getattr(pool, "metrics", None) is not None:
+            entry.update(pool.metrics.snapshot())
+        stats[engine.url.render_as_string(hide_password=True)] = entry
+    return stats
+
+
+def describe_pool(entry: dict) -> str:
+    """Formats one `pool_stats` entry on a line: size and use, then checkout waits where metered."""
+    parts = [entry["pool"]]
+    if "size" in entry:
+        parts.append(f"size {entry['size']}, {entry['in_use']} in use, overflow {entry['overflow']}")
+    if "checkouts" in entry:
+        parts.append(
+            f"{entry['checkouts']} checkouts, {entry['timeouts']} timeouts, "
+            f"wait avg {entry['avg_wait_ms']} ms / max {entry['max_wait_ms']} ms, peak {entry['peak_in_use']} in use"
+        )
+    return ", ".join(parts)
@@ -0,0 +1,300 @@
+import time
+from crewai_tools import tool
+from sqlalchemy import text
+from engines import get_engine
+from schema_snapshot import get_schema_snapshot, invalidate_schema_snapshot
+from tools import result_cache
+import config
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.dialects.dialect import Dialect
+    from sqlglot.errors import SqlglotError, TokenError
+    from sqlglot.tokens import TokenType
+except ImportError:  # Optional: without sqlglot statements are split on semicolons and never chunked
+    sqlglot = None
+
+# SQLAlchemy dialect names that sqlglot spells differently
+SQLGLOT_DIALECTS = {"postgresql": "postgres"}
+# Statements a dry run may execute and roll back; DDL would commit implicitly on MySQL
+DML_STATEMENTS = ("insert", "update", "delete", "replace")
+
+
+def _split_statements(script: str, dialect: str) -> list:
+    """
+    Splits a SQL script into statements at the semicolons found by sqlglot's tokenizer, so
+    semicolons inside strings and comments do not split. Statements are kept as written: sqlglot
+    re-renders some MySQL syntax differently (`REGEXP` as `REGEXP_LIKE`), so its output is only
+    used to chunk UPDATE and DELETE statements.
+
+    Returns:
+        list: `(sql, parsed)` pairs; `parsed` is the sqlglot expression of an UPDATE or DELETE,
+            or None for other statements, statements sqlglot cannot parse, or without sqlglot.
+    """
+    if sqlglot is None:
+        return [(statement.strip(), None) for statement in script.split(";") if statement.strip()]
+    dialect = SQLGLOT_DIALECTS.get(dialect, dialect)
+    try:
+        tokens = Dialect.get_or_raise(dialect).tokenize(script)
+    except TokenError:
+        return [(statement.strip(), None) for statement in script.split(";") if statement.strip()]
+
+    pieces, current = [], []
+    for token in tokens + [None]:
+        if token is None or token.token_type == TokenType.SEMICOLON:
+            if current:
+                pieces.append(script[current[0].start:current[-1].end + 1].strip())
+            current = []
+        else:
+            current.append(token)
+
+    statements = []
+    for sql in pieces:
+        parsed = None
+        if sql.split(None, 1)[0].lower() in ("update", "delete"):
+            try:
+                parsed = sqlglot.parse_one(sql, read=dialect)
+            except SqlglotError:
+                pass
+        statements.append((sql, parsed))
+    return statements
+
+
+def _chunk_key(statement, snapshot):
+    """
+    Tells whether a statement can be split into primary-key ranges: a single-table UPDATE or
+    DELETE without joins, ORDER BY or LIMIT, on a table with a one-column primary key.
+
+    Returns:
+        tuple: The target table expression and its primary key column, or None.
+    """
+    if statement is None or not isinstance(statement, (exp.Update, exp.Delete)):
+        return None
+    target = statement.this
+    if not isinstance(target, exp.Table) or target.args.get("joins"):
+        return None
+    if any(statement.args.get(name) for name in ("from", "tables", "using", "order", "limit", "returning")):
+        return None
+
+    tables = {name.lower(): name for name in snapshot.table_names()}
+    table = tables.get(target.name.lower())
+    if table is None or len(snapshot.primary_keys.get(table, [])) != 1:
+        return None
+    return target, snapshot.primary_keys[table][0]
+
+
+def _estimate_rows(connection, sql: str):
+    """
+    Asks the optimizer how many rows a statement touches, without running it.
+
+    Returns:
+        int: The estimate, or None when the database gives none (e.g. SQLite) or EXPLAIN fails.
+    """
+    dialect = connection.dialect.name
+    try:
+        if dialect == "mysql":
+            rows = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+            return max((int(row.get("rows") or 0) for row in rows), default=0)
+        if dialect == "postgresql":
+            plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        connection.rollback()
+    return None
+
+
+def _key_ranges(engine, target, key: str, chunk_rows: int, dialect: str):
+    """
+    Yields `(lower, upper)` primary-key bounds of consecutive ranges of about `chunk_rows` rows,
+    found one at a time so rows changed by earlier chunks do not shift later bounds. Either
+    bound is None when the range is open on that side.
+    """
+    table = target.copy()
+    table.set("alias", None)
+    column = exp.column(key, quoted=True)
+    lower = None
+    while True:
+        query = exp.select(column).from_(table).order_by(column).limit(1).offset(chunk_rows)
+        if lower is not None:
+            query = query.where(exp.GTE(this=column.copy(), expression=exp.convert(lower)))
+        with engine.connect() as connection:
+            upper = connection.execute(text(query.sql(dialect=dialect))).scalar()
+        yield lower, upper
+        if upper is None:
+            return
+        lower = upper
+
+
+def _ranged(statement, target, key: str, lower, upper, dialect: str) -> str:
+    """Renders a statement restricted to the primary-key range `[lower, upper)`."""
+    column = exp.column(key, table=target.alias_or_name, quoted=True)
+    conditions = []
+    where = statement.args.get("where")
+    if where is not None:
+        conditions.append(exp.paren(where.this.copy()))
+    if lower is not None:
+        conditions.append(exp.GTE(this=column.copy(), expression=exp.convert(lower)))
+    if upper is not None:
+        conditions.append(exp.LT(this=column.copy(), expression=exp.convert(upper)))
+    ranged = statement.copy()
+    ranged.set("where", exp.Where(this=exp.and_(*conditions)))
+    return ranged.sql(dialect=dialect)
+
+
+def apply_fix_statements(script: str, dry_run: bool = False, atomic: bool = False, chunk_rows: int = None) -> list:
+    """
+    Runs fix statements one by one, each in its own short transaction.
+
+    Each statement is first EXPLAINed to estimate the rows it touches. A single-table UPDATE or
+    DELETE estimated above `chunk_rows` (or with no estimate) is run over primary-key ranges of
+    about `chunk_rows` rows, committing after each range, so no lock is held for long; the
+    ranges can be re-run safely if a chunk fails. Execution stops at the first failure, rolling
+    back that statement's open transaction.
+
+    Args:
+        script (str): SQL statements separated by semicolons.
+        dry_run (bool): Only estimate and plan. DML statements estimated at most `chunk_rows`
+            rows are run in a transaction that is rolled back, to report the exact rows they
+            would change; the others are only reported as planned, with their estimate.
+        atomic (bool): Run every statement unchunked in one transaction, rolled back entirely
+            on failure. Meant for small fix sets; DDL commits implicitly on MySQL.
+        chunk_rows (int): Rows per chunk. Defaults to `fix_chunk_rows`.
+
+    Returns:
+        list: One dict per statement with its estimate, rows affected, chunks, seconds and status.
+    """
+    chunk_rows = chunk_rows or config.settings.fix_chunk_rows
+    engine = get_engine()
+    dialect = SQLGLOT_DIALECTS.get(engine.dialect.name, engine.dialect.name)
+    snapshot = get_schema_snapshot(engine)
+    statements = _split_statements(script, engine.dialect.name)
+
+    results = []
+    for sql, statement in statements:
+        result = {"statement": sql, "estimated_rows": None, "rows": None, "chunks": 0, "seconds": 0.0, "status": "pending", "error": None}
+        with engine.connect() as connection:
+            result["estimated_rows"] = _estimate_rows(connection, sql)
+        chunking = None if atomic else _chunk_key(statement, snapshot)
+        if chunking and result["estimated_rows"] is not None and result["estimated_rows"] <= chunk_rows:
+            chunking = None
+        result["chunked"] = bool(chunking)
+        results.append(result)
+
+    if dry_run:
+        for result, (sql, statement) in zip(results, statements):
+            small = result["estimated_rows"] is not None and result["estimated_rows"] <= chunk_rows
+            if result["chunked"] or not small or sql.split(None, 1)[0].lower() not in DML_STATEMENTS:
+                # Running a large or unestimated statement, even to roll it back, would lock what it touches
+                result["status"] = "planned"
+                continue
+            started = time.perf_counter()
+            with engine.connect() as connection:
+                try:
+                    result["rows"] = connection.execute(text(sql)).rowcount
+                    result["status"] = "dry run"
+                except Exception as e:
+                    result["status"], result["error"] = "failed", str(getattr(e, "orig", None) or e)
+                finally:
+                    connection.rollback()
+            result["seconds"] = time.perf_counter() - started
+        return results
+
+    try:
+        if atomic:
+            with engine.begin() as connection:
+                for result, (sql, statement) in zip(results, statements):
+                    started = time.perf_counter()
+                    try:
+                        result["rows"] = connection.execute(text(sql)).rowcount
+                        result["chunks"] = 1
+                        result["status"] = "applied"
+                    except Exception as e:
+                        result["status"], result["error"] = "failed", str(getattr(e, "orig", None) or e)
+                        raise
+                    finally:
+                        result["seconds"] = time.perf_counter() - started
+            return results
+
+        for result, (sql, statement) in zip(results, statements):
+            started = time.perf_counter()
+            result["rows"] = 0
+            try:
+                if result["chunked"]:
+                    target, key = _chunk_key(statement, snapshot)
+                    for lower, upper in _key_ranges(engine, target, key, chunk_rows, dialect):
+                        with engine.begin() as connection:
+                            result["rows"] += connection.execute(text(_ranged(statement, target, key, lower, upper, dialect))).rowcount
+                        result["chunks"] += 1
+                else:
+                    with engine.begin() as connection:
+                        result["rows"] = connection.execute(text(sql)).rowcount
+                    result["chunks"] = 1
+                result["status"] = "applied"
+            except Exception as e:
+                result["status"], result["error"] = "failed", str(getattr(e, "orig", None) or e)
+                raise
+            finally:
+                result["seconds"] = time.perf_counter() - started
+    except Exception:
+        # Stop at the first failure; statements after it are not run
+        for result in results:
+            if result["status"] == "pending":
+                result["status"] = "skipped"
+            elif atomic and result["status"] == "applied":
+                result["status"] = "rolled back"
+    finally:
+        if any(result["status"] in ("applied", "failed") for result in results):
+            # Cached schema and execute_sql results may now be stale
+            invalidate_schema_snapshot(engine)
+            result_cache.clear()
+    return results
+
+
+@tool("apply_fixes")
+def apply_fixes(statements: str, dry_run: bool = False, atomic: bool = False) -> str:
+    """
+    Applies fix statements (UPDATE, DELETE, INSERT, ALTER, ...) safely: each is EXPLAINed to
+    estimate the rows it touches, and large single-table UPDATEs and DELETEs are run in
+    primary-key ranges with a short transaction each, so tables are never locked for long.
+    Always run with `dry_run=True` first to review the estimates.
+
+    Args:
+        statements (str): SQL statements separated by semicolons.
+        dry_run (bool): Only estimate the rows each statement would change; nothing is committed.
+        atomic (bool): Apply all statements in one transaction, rolled back entirely if any
+            fails. Only for small fixes: large statements are not chunked in this mode.
+
+    Returns:
+        str: A table with the estimated and affected rows, chunks, time and status of each statement.
+    """
+    try:
+        results = apply_fix_statements(statements, dry_run=dry_run, atomic=atomic)
+        if not results:
+            return "⚠ No statements to apply."
+
+        lines = [
+            "| # | Statement | Estimated rows | Rows | Chunks | Time (s) | Status |",
+            "|---|---|---|---|---|---|---|",
+        ]
+        for number, result in enumerate(results, 1):
+            statement = " ".join(result["statement"].split())
+            statement = statement if len(statement) <= 80 else statement[:77] + "..."
+            estimate = "?" if result["estimated_rows"] is None else result["estimated_rows"]
+            rows = "" if result["rows"] is None or result["rows"] < 0 else result["rows"]
+            chunks = "chunked" if dry_run and result["chunked"] else result["chunks"]
+            status = f"❌ {result['status']}: {result['error']}" if result["error"] else result["status"]
+            lines.append(f"| {number} | `{statement}` | {estimate} | {rows} | {chunks} | {result['seconds']:.2f} | {status} |")
+
+        failed = [result for result in results if result["status"] == "failed"]
+        if dry_run:
+            summary = f"🧪 Dry run of {len(results)} statements: nothing was committed."
+        elif failed and atomic:
+            summary = f"❌ Statement {results.index(failed[0]) + 1} of {len(results)} failed; all statements were rolled back."
+        elif failed:
+            summary = f"❌ Statement {results.index(failed[0]) + 1} of {len(results)} failed; later statements were skipped."
+        else:
+            summary = f"✅ Applied {len(results)} statements ({sum(max(result['rows'] or 0, 0) for result in results)} rows changed)."
+        return "\n".join([summary, ""] + lines)
+    except Exception as e:
+        return f"❌ Error applying fixes: {str(e)}"
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from crewai_tools import tool
+from sqlalchemy import text
+from schema_snapshot import get_schema_snapshot
+from engines import get_engine
+import config
+
+
+def _relationships_from_csv(file_path: str) -> list:
+    """
+    Reads ground-truth relationships from a CSV file with the columns `table_name`, `column_name`,
+    `referred_table` and `referred_column`, one row per column pair. Rows sharing a
+    `constraint_name` (optional column) form one composite relationship.
+
+    Returns:
+        list: Relationships in the same layout as `SchemaSnapshot.foreign_keys`.
+    """
+    df = pd.read_csv(file_path)
+    if "constraint_name" not in df.columns:
+        df["constraint_name"] = df["table_name"] + "." + df["column_name"] + "->" + df["referred_table"]
+
+    relationships = []
+    for (constraint, table, referred_table), group in df.groupby(
+        ["constraint_name", "table_name", "referred_table"], sort=False
+    ):
+        relationships.append({
+            "name": constraint,
+            "table": table,
+            "constrained_columns": list(group["column_name"]),
+            "referred_table": referred_table,
+            "referred_columns": list(group["referred_column"]),
+        })
+    return relationships
+
+
+def _collect_relationships(snapshot, relationships_csv: str = "") -> list:
+    """
+    Merges the declared foreign keys with the ground-truth relationships from CSV,
+    dropping ground-truth entries that duplicate a declared key.
+    """
+    relationships = [
+        {**foreign_key, "table": table, "source": "declared"}
+        for table in snapshot.table_names()
+        for foreign_key in snapshot.foreign_keys[table]
+        if not foreign_key["referred_schema"]
+    ]
+    if relationships_csv:
+        seen = {
+            (item["table"], tuple(item["constrained_columns"]), item["referred_table"], tuple(item["referred_columns"]))
+            for item in relationships
+        }
+        for item in _relationships_from_csv(relationships_csv):
+            key = (item["table"], tuple(item["constrained_columns"]), item["referred_table"], tuple(item["referred_columns"]))
+            if key not in seen:
+                seen.add(key)
+                relationships.append({**item, "source": "ground_truth"})
+    return relationships
+
+
+def _check_relationship(snapshot, relationship: dict, sample_size: int) -> dict:
+    """
+    Counts the child rows whose key has no matching parent row (an anti-join), and fetches a
+    few of the orphaned keys. Rows with a NULL in any key column are not orphans, as in MySQL.
+    """
+    child, parent = relationship["table"], relationship["referred_table"]
+    child_columns, parent_columns = relationship["constrained_columns"], relationship["referred_columns"]
+    result = {
+        "constraint": relationship["name"],
+        "source": relationship["source"],
+        "child_table": child,
+        "child_columns": child_columns,
+        "parent_table": parent,
+        "parent_columns": parent_columns,
+        "orphan_rows": None,
+        "sample_keys": [],
+        "error": None,
+    }
+
+    for table, columns in ((child, child_columns), (parent, parent_columns)):
+        known = {column["name"] for column in snapshot.columns.get(table, [])}
+        if table not in snapshot.tables:
+            result["error"] = f"table '{table}' does not exist"
+            return result
+        if not set(columns) <= known:
+            result["error"] = f"columns {sorted(set(columns) - known)} do not exist in '{table}'"
+            return result
+
+    keys = ", ".join(f"c.`{column}`" for column in child_columns)
+    not_null = " AND ".join(f"c.`{column}` IS NOT NULL" for column in child_columns)
+    matches = " AND ".join(
+        f"p.`{parent_column}` = c.`{child_column}`" for child_column, parent_column in zip(child_columns, parent_columns)
+    )
+    orphans = f"FROM `{child}` c WHERE {not_null} AND NOT EXISTS (SELECT 1 FROM `{parent}` p WHERE {matches})"
+
+    try:
+        # The snapshot's engine, not get_engine(): worker threads do not see the database bound by the caller
+        with snapshot.engine.connect() as connection:
+            result["orphan_rows"] = connection.execute(text(f"SELECT COUNT(*) {orphans}")).scalar()
+            if result["orphan_rows"]:
+                rows = connection.execute(text(f"SELECT DISTINCT {keys} {orphans} LIMIT {int(sample_size)}"))
+                result["sample_keys"] = [row[0] if len(row) == 1 else tuple(row) for row in rows]
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def check_relationships(relationships_csv: str = "", sample_size: int = 5) -> list:
+    """
+    Checks every declared foreign key, plus any ground-truth relationship from CSV, for orphaned rows.
+    The anti-join queries run concurrently on a pool of `integrity_max_workers` connections.
+
+    Args:
+        relationships_csv (str): Optional CSV file with ground-truth relationships.
+        sample_size (int): Number of orphaned keys to sample per relationship.
+
+    Returns:
+        list: One result dict per relationship with its orphan count and sample keys.
+    """
+    snapshot = get_schema_snapshot(get_engine())
+    relationships = _collect_relationships(snapshot, relationships_csv)
+    with ThreadPoolExecutor(max_workers=config.settings.integrity_max_workers, thread_name_prefix="integrity") as executor:
+        return list(executor.map(lambda relationship: _check_relationship(snapshot, relationship, sample_size), relationships))
+
+
+@tool("check_foreign_key_integrity")
+def check_foreign_key_integrity(relationships_csv: str = "") -> str:
+    """
+    Finds orphaned rows for every foreign key in the database in one pass.
+
+    Args:
+        relationships_csv (str): Optional path to a CSV file with ground-truth relationships
+            (`table_name`, `column_name`, `referred_table`, `referred_column`) to check as well.
+
+    Returns:
+        str: A table with the orphan count and sample orphaned keys of each relationship.
+    """
+    try:
+        results = check_relationships(relationships_csv)
+        if not results:
+            return "⚠ No foreign keys or ground-truth relationships found to check."
+
+        lines = [
+            "| Relationship | Source | Orphan rows | Sample orphaned keys |",
+            "|---|---|---|---|",
+        ]
+        for result in results:
+            relationship = (
+                f"{result['child_table']}({', '.join(result['child_columns'])}) -> "
+                f"{result['parent_table']}({', '.join(result['parent_columns'])})"
+            )
+            if result["error"]:
+                lines.append(f"| {relationship} | {result['source']} | ❌ error | {result['error']} |")
+            else:
+                samples = ", ".join(str(key) for key in result["sample_keys"])
+                lines.append(f"| {relationship} | {result['source']} | {result['orphan_rows']} | {samples} |")
+
+        violated = sum(1 for result in results if result["orphan_rows"])
+        summary = f"Checked {len(results)} relationships: {violated} with orphaned rows."
+        return "\n".join([summary, ""] + lines)
+    except Exception as e:
+        return f"❌ Error checking foreign key integrity: {str(e)}"
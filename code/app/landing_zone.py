@@ -1,40 +1,544 @@
+import contextvars
 import os
 import pandas as pd
 from crewai import Agent, Crew, Task, Process
 from crewai_tools import tool
 from textwrap import dedent
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect, text
+from concurrent.futures import ThreadPoolExecutor
 import time
+import uuid
+from llm_cache import CachedLLM
+from engines import get_engine
+from table_chunks import read_table_chunks
 import config
 
 
-db_engine = create_engine(config.DB_URI)
-os.environ["GROQ_API_KEY"] = "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"
+MANIFEST_FILE = "manifest.json"
+STATE_FILE = "landing_zone_state.json"
+# Rows sharing the highest timestamp watermark that are remembered by key, so the next delta
+# skips them; past this many the table is re-exported in full instead
+MAX_WATERMARK_TIES = 1000
+
+
+def _write_csv(chunks, file_path: str) -> int:
+    """
+    Appends each chunk to a single CSV file.
+
+    Returns:
+        int: Rows written.
+    """
+    rows_written = 0
+    with open(file_path, "w", newline="", encoding="utf-8") as file:
+        for index, chunk in enumerate(chunks):
+            chunk.to_csv(file, index=False, header=(index == 0))
+            rows_written += len(chunk)
+    return rows_written
+
+
+def _arrow_types(connection, table: str) -> dict:
+    """
+    Maps the reflected column types of `table` to Arrow types so Parquet files keep
+    the source types instead of whatever pandas infers from the first chunk.
+
+    Returns:
+        dict: Column name to Arrow type, for the columns whose type could be mapped.
+    """
+    import datetime
+    import decimal
+    import pyarrow as pa
+
+    mapping = {
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+        bytes: pa.binary(),
+        bool: pa.bool_(),
+        datetime.datetime: pa.timestamp("us"),
+        datetime.date: pa.date32(),
+        datetime.time: pa.time64("us"),
+        datetime.timedelta: pa.duration("us"),
+    }
+    if connection.dialect.name == "mysql":
+        # MySQL TIME is an interval (-838:59:59 to 838:59:59), returned by the driver as a timedelta
+        mapping[datetime.time] = pa.duration("us")
+
+    arrow_types = {}
+    for column in inspect(connection).get_columns(table):
+        try:
+            python_type = column["type"].python_type
+        except NotImplementedError:
+            continue
+        if python_type is decimal.Decimal:
+            precision = getattr(column["type"], "precision", None)
+            scale = getattr(column["type"], "scale", None) or 0
+            if not precision:
+                arrow_types[column["name"]] = pa.float64()
+            else:
+                # decimal128 holds at most 38 digits; MySQL DECIMAL goes up to 65
+                decimal_type = pa.decimal128 if precision <= 38 else pa.decimal256
+                arrow_types[column["name"]] = decimal_type(precision, scale)
+        elif python_type in mapping:
+            arrow_types[column["name"]] = mapping[python_type]
+    return arrow_types
+
+
+def _write_parquet(chunks, path: str, arrow_types: dict, compression: str, partition_column: str = "") -> tuple:
+    """
+    Writes chunks into a Parquet file, or into a Hive-partitioned directory of Parquet
+    files when `partition_column` is set.
+
+    Returns:
+        tuple: Rows written, list of written file paths and the Arrow schema.
+    """
+    import shutil
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    compression = None if compression == "none" else compression
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    rows_written = 0
+    schema = None
+    writer = None
+    try:
+        for index, chunk in enumerate(chunks):
+            batch = pa.Table.from_pandas(chunk, preserve_index=False)
+            if schema is None:
+                schema = batch.schema.remove_metadata()
+                for field in batch.schema:
+                    arrow_type = arrow_types.get(field.name)
+                    if arrow_type is None and pa.types.is_null(field.type):
+                        # All-NULL in the first chunk and no reflected type to go on
+                        arrow_type = pa.string()
+                    elif arrow_type is not None and pa.types.is_decimal(arrow_type) and pa.types.is_floating(field.type):
+                        # The driver already returned floats, keep them rather than re-quantizing
+                        arrow_type = field.type
+                    if arrow_type is not None:
+                        schema = schema.set(schema.get_field_index(field.name), pa.field(field.name, arrow_type))
+            batch = batch.cast(schema)
+            rows_written += batch.num_rows
+
+            if partition_column:
+                pq.write_to_dataset(
+                    batch,
+                    root_path=path,
+                    partition_cols=[partition_column],
+                    compression=compression,
+                    basename_template=f"part-{index}-{{i}}.parquet",
+                    existing_data_behavior="overwrite_or_ignore",
+                )
+            else:
+                if writer is None:
+                    writer = pq.ParquetWriter(path, schema, compression=compression)
+                writer.write_table(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if partition_column:
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(path)
+            for name in names
+            if name.endswith(".parquet")
+        )
+    else:
+        files = [path]
+    return rows_written, files, schema
+
+
+def _file_checksum(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _estimate_table_rows() -> dict:
+    """
+    Fetches row-count estimates for every table in the current schema from `information_schema`.
+
+    Returns:
+        dict: Table name to estimated row count.
+    """
+    query = text(
+        "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE()"
+    )
+    with get_engine().connect() as connection:
+        return {name: rows or 0 for name, rows in connection.execute(query)}
+
+
+def _export_table(
+    table: str,
+    folder_path: str,
+    chunk_size: int,
+    file_format: str = "csv",
+    compression: str = "zstd",
+    partition_column: str = "",
+    where: str = "",
+    params: dict = None,
+    file_stem: str = "",
+) -> dict:
+    """
+    Exports a single table into the Landing Zone.
+
+    CSV tables are written to `<folder_path>/<file_stem>.csv`. Parquet tables are written to
+    `<folder_path>/<file_stem>.parquet`, or to a `<folder_path>/<file_stem>/` directory partitioned
+    by `partition_column`. `file_stem` defaults to the table name; `where` restricts the export
+    to a subset of rows (used for incremental deltas).
+
+    Returns:
+        dict: Manifest entry with the table's schema, row count and files.
+    """
+    file_stem = file_stem or table
+    with get_engine().connect() as connection:
+        keys = inspect(connection).get_pk_constraint(table).get("constrained_columns") or []
+        chunks = read_table_chunks(connection, table, "*", keys, chunk_size, where, params)
+        if file_format == "parquet":
+            arrow_types = _arrow_types(connection, table)
+            path = os.path.join(folder_path, file_stem if partition_column else f"{file_stem}.parquet")
+            rows, files, schema = _write_parquet(chunks, path, arrow_types, compression, partition_column)
+            columns = [{"name": field.name, "type": str(field.type)} for field in schema] if schema else []
+        else:
+            path = os.path.join(folder_path, f"{file_stem}.csv")
+            rows = _write_csv(chunks, path)
+            files = [path]
+            columns = [
+                {"name": column["name"], "type": str(column["type"])}
+                for column in inspect(connection).get_columns(table)
+            ]
+
+    entry = {
+        "table": table,
+        "format": file_format,
+        "compression": compression if file_format == "parquet" else None,
+        "partition_column": partition_column or None,
+        "rows": rows,
+        "rows_written": rows,
+        "bytes": sum(os.path.getsize(file) for file in files),
+        "columns": columns,
+        "files": [
+            {
+                "path": os.path.relpath(file, folder_path),
+                "bytes": os.path.getsize(file),
+                "sha256": _file_checksum(file),
+                "kind": "delta" if where else "full",
+            }
+            for file in files
+        ],
+    }
+    print(f"✅ Exported table '{table}' to {path} ({rows} rows, {entry['bytes']} bytes)")
+    return entry
+
+
+def _load_json(file_path: str, default: dict) -> dict:
+    """Loads a JSON file from the Landing Zone, falling back to `default` when it doesn't exist."""
+    import json
+
+    if not os.path.exists(file_path):
+        return default
+    with open(file_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _watermark_column(connection, table: str):
+    """
+    Picks the column used to find new or changed rows in `table`.
+
+    Prefers a timestamp column from `landing_zone_watermark_columns` (catches updates),
+    then a single-column auto-increment primary key (catches appends only).
+
+    Returns:
+        tuple: Column name and comparison operator, or (None, None) if the table has neither.
+    """
+    inspector = inspect(connection)
+    columns = {column["name"]: column for column in inspector.get_columns(table)}
+
+    for name in config.settings.landing_zone_watermark_columns:
+        if name in columns:
+            return name, ">="
+
+    primary_key = inspector.get_pk_constraint(table).get("constrained_columns") or []
+    if len(primary_key) == 1 and columns[primary_key[0]].get("autoincrement") is True:
+        return primary_key[0], ">"
+
+    return None, None
+
+
+def _table_fingerprint(connection, table: str, watermark_column: str, tie_keys: list = None) -> dict:
+    """
+    Computes the cheap fingerprint used to decide whether `table` changed since the last run:
+    the row count plus either the highest watermark value or `CHECKSUM TABLE`.
+
+    With `tie_keys`, the watermark is not unique and the keys of the rows holding the highest
+    value are recorded too, as `watermark_ties` (None when there are more than `MAX_WATERMARK_TIES`).
+    """
+    fingerprint = {"rows": connection.execute(text(f"SELECT COUNT(*) FROM `{table}`")).scalar()}
+    if watermark_column:
+        watermark = connection.execute(text(f"SELECT MAX(`{watermark_column}`) FROM `{table}`")).scalar()
+        fingerprint["watermark"] = watermark if watermark is None or isinstance(watermark, int) else str(watermark)
+        if tie_keys is not None:
+            ties = []
+            if tie_keys and watermark is not None:
+                ties = connection.execute(
+                    text(
+                        f"SELECT {', '.join(f'`{key}`' for key in tie_keys)} FROM `{table}` "
+                        f"WHERE `{watermark_column}` = :watermark LIMIT {MAX_WATERMARK_TIES + 1}"
+                    ),
+                    {"watermark": watermark},
+                ).fetchall()
+            # Stored as text, like the watermark, so the state compares equal once reloaded from JSON
+            fingerprint["watermark_ties"] = (
+                sorted([str(value) for value in row] for row in ties)
+                if tie_keys and len(ties) <= MAX_WATERMARK_TIES
+                else None
+            )
+    else:
+        fingerprint["checksum"] = connection.execute(text(f"CHECKSUM TABLE `{table}`")).fetchone()[1]
+    return fingerprint
+
+
+def _export_table_incremental(table: str, folder_path: str, previous: dict, run_id: str, **export_options) -> tuple:
+    """
+    Exports only what changed in `table` since the state recorded in `previous`.
+
+    - Unchanged row count and watermark/checksum: the table is skipped.
+    - A watermark column and no shrinking row count: rows past the stored watermark are
+      written to a `<table>.delta-<run_id>` file. For a timestamp watermark, rows at the stored
+      value are included too, except those already exported (its recorded ties), so no row is
+      written twice; without a primary key to recognise them the table is re-exported in full.
+    - Anything else (first run, no watermark column, deleted rows): full re-export.
+
+    Returns:
+        tuple: Action taken ("skipped", "delta" or "full"), manifest entry (None when skipped)
+            and the table's new state.
+    """
+    with get_engine().connect() as connection:
+        watermark_column, operator = _watermark_column(connection, table)
+        tie_keys = None
+        if operator == ">=":
+            tie_keys = inspect(connection).get_pk_constraint(table).get("constrained_columns") or []
+        fingerprint = _table_fingerprint(connection, table, watermark_column, tie_keys)
+
+    state = {"format": export_options.get("file_format", "csv"), "watermark_column": watermark_column, **fingerprint}
+    if previous and all(previous.get(key) == value for key, value in state.items()):
+        print(f"⏭ Skipped unchanged table '{table}'")
+        return "skipped", None, previous
+
+    can_append = (
+        previous
+        and watermark_column
+        and previous.get("format") == state["format"]
+        and previous.get("watermark_column") == watermark_column
+        and previous.get("watermark") is not None
+        and (operator != ">=" or previous.get("watermark_ties") is not None)
+        and fingerprint["rows"] >= previous.get("rows", 0)
+    )
+    if can_append:
+        where = f"`{watermark_column}` {operator} :watermark"
+        params = {"watermark": previous["watermark"]}
+        if operator == ">=" and previous["watermark_ties"]:
+            # Rows at the stored watermark that were already exported are left out
+            key_list = ", ".join(f"`{key}`" for key in tie_keys)
+            ties = ", ".join(
+                "(" + ", ".join(f":tie_{row}_{column}" for column in range(len(tie))) + ")"
+                for row, tie in enumerate(previous["watermark_ties"])
+            )
+            where = (
+                f"(`{watermark_column}` > :watermark OR "
+                f"(`{watermark_column}` = :watermark AND ({key_list}) NOT IN ({ties})))"
+            )
+            params.update({
+                f"tie_{row}_{column}": value
+                for row, tie in enumerate(previous["watermark_ties"])
+                for column, value in enumerate(tie)
+            })
+        entry = _export_table(
+            table,
+            folder_path,
+            where=where,
+            params=params,
+            file_stem=f"{table}.delta-{run_id}",
+            **export_options,
+        )
+        return "delta", entry, state
+
+    return "full", _export_table(table, folder_path, **export_options), state
+
+
+def _write_json(file_path: str, data: dict):
+    """Writes `data` as JSON, replacing the file atomically so a crash never leaves it half-written."""
+    import json
+
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, default=str)
+    os.replace(temp_path, file_path)
+
+
+def _write_manifest(folder_path: str, entries: list) -> str:
+    """
+    Writes the Landing Zone manifest next to the exported files.
+
+    Downstream readers can use it to check checksums and open the Parquet files
+    (e.g. `pyarrow.parquet.read_table(path, memory_map=True)`) without touching the source database.
+
+    Returns:
+        str: Path to the manifest.
+    """
+    from datetime import datetime, timezone
+
+    manifest_path = os.path.join(folder_path, MANIFEST_FILE)
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "database": get_engine().url.database,
+        "tables": entries,
+    }
+    _write_json(manifest_path, manifest)
+    return manifest_path
+
 
 @tool("export_tables_to_landing_zone")
-def export_tables_to_landing_zone(folder_path: str) -> str:
+def export_tables_to_landing_zone(
+    folder_path: str,
+    chunk_size: int = config.settings.landing_zone_chunk_size,
+    max_workers: int = config.settings.landing_zone_max_workers,
+    file_format: str = config.settings.landing_zone_format,
+    compression: str = config.settings.landing_zone_compression,
+    partition_column: str = "",
+    incremental: bool = config.settings.landing_zone_incremental,
+) -> str:
     """
-    Exports all tables from the database into the specified folder as CSV files.
-    Ensures data completeness by saving a copy of raw data.
+    Exports all tables from the database into the specified folder as CSV or Parquet files.
+    Ensures data completeness by saving a copy of raw data, and records a manifest with
+    the schema, row count and checksums of every file.
+
+    In incremental mode a per-table watermark is kept in the folder's state file: unchanged
+    tables are skipped and only new or updated rows are written, as delta files.
+
+    Args:
+        folder_path (str): Landing Zone folder to export into.
+        chunk_size (int): Rows read per chunk, streamed or paged by primary key. Use 0 to load each table in one read.
+        max_workers (int): Number of tables exported concurrently, capped by `landing_zone_max_workers`.
+        file_format (str): "csv" or "parquet".
+        compression (str): Parquet compression codec: "zstd", "snappy" or "none".
+        partition_column (str): Parquet only. Partition tables that have this column and at least
+            `landing_zone_partition_min_rows` rows by its values.
+        incremental (bool): Export only tables and rows that changed since the previous run.
+
+    Returns:
+        str: Rows and bytes written per table, or an error message.
     """
     try:
+        if file_format not in ("csv", "parquet"):
+            return f"❌ Unsupported Landing Zone format '{file_format}'. Use 'csv' or 'parquet'."
+
         if not os.path.exists(folder_path):
             os.makedirs(folder_path)
 
         # Use the SQLAlchemy inspector to fetch table names
-        inspector = inspect(db_engine)
+        inspector = inspect(get_engine())
         tables = inspector.get_table_names()
 
-        # Export each table to CSV
-        for table in tables:
-            print(table)
-            query = f"SELECT * FROM {table}"
-            df = pd.read_sql(query, db_engine)
-            file_path = os.path.join(folder_path, f"{table}.csv")
-            df.to_csv(file_path, index=False)
-            print(f"✅ Exported table '{table}' to {file_path}")
+        # Schedule the largest tables first so they don't end up as the long tail
+        estimates = _estimate_table_rows()
+        tables = sorted(tables, key=lambda table: estimates.get(table, 0), reverse=True)
 
-        return f"Successfully exported {len(tables)} tables to the Landing Zone: {folder_path}"
+        partitioned = set()
+        if file_format == "parquet" and partition_column:
+            partitioned = {
+                table for table in tables
+                if estimates.get(table, 0) >= config.settings.landing_zone_partition_min_rows
+                and partition_column in {column["name"] for column in inspector.get_columns(table)}
+            }
+
+        export_options = {"chunk_size": chunk_size, "file_format": file_format, "compression": compression}
+        previous_state = _load_json(os.path.join(folder_path, STATE_FILE), {"tables": {}})["tables"] if incremental else {}
+        previous_entries = {
+            entry["table"]: entry
+            for entry in _load_json(os.path.join(folder_path, MANIFEST_FILE), {"tables": []})["tables"]
+        } if incremental else {}
+        # Unique even for refreshes started within the same second
+        run_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+        # Export each table on a bounded worker pool
+        workers = max(1, min(max_workers, config.settings.landing_zone_max_workers))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="landing-zone") as executor:
+            futures = {}
+            for table in tables:
+                options = {**export_options, "partition_column": partition_column if table in partitioned else ""}
+                # Each worker runs in a copy of the caller's context, so it reads the database bound by the caller
+                context = contextvars.copy_context()
+                if incremental:
+                    futures[table] = executor.submit(
+                        context.run, _export_table_incremental, table, folder_path, previous_state.get(table), run_id, **options
+                    )
+                else:
+                    futures[table] = executor.submit(context.run, _export_table, table, folder_path, **options)
+
+        report = []
+        entries = []
+        state = {}
+        failed = 0
+        skipped = 0
+        for table, future in futures.items():
+            try:
+                if not incremental:
+                    action, entry = "full", future.result()
+                else:
+                    action, entry, state[table] = future.result()
+                    previous_entry = previous_entries.get(table)
+                    if action == "skipped":
+                        skipped += 1
+                        if previous_entry:
+                            entries.append(previous_entry)
+                        report.append(f"- {table}: unchanged, skipped")
+                        continue
+                    if action == "delta" and previous_entry:
+                        # Rows updated since the base was written are in a delta file too: `rows` is
+                        # the table's row count, `rows_written` what its files hold altogether
+                        entry = {
+                            **previous_entry,
+                            "rows": state[table]["rows"],
+                            "rows_written": previous_entry.get("rows_written", previous_entry["rows"]) + entry["rows"],
+                            "bytes": previous_entry["bytes"] + entry["bytes"],
+                            "files": previous_entry["files"] + entry["files"],
+                        }
+                    elif previous_entry:
+                        # Full re-export: drop the previous base and delta files it replaces
+                        kept = {file["path"] for file in entry["files"]}
+                        for file in previous_entry["files"]:
+                            stale = os.path.join(folder_path, file["path"])
+                            if file["path"] not in kept and os.path.exists(stale):
+                                os.remove(stale)
+                entries.append(entry)
+                report.append(
+                    f"- {table}: {action}, {entry['rows']} rows, "
+                    f"{entry['bytes']} bytes in {len(entry['files'])} file(s)"
+                )
+            except Exception as e:
+                failed += 1
+                report.append(f"- ❌ {table}: {str(e)}")
+
+        manifest_path = _write_manifest(folder_path, entries)
+        state_path = os.path.join(folder_path, STATE_FILE)
+        if incremental:
+            _write_json(state_path, {"tables": state})
+        elif os.path.exists(state_path):
+            # The watermarks describe the files this run replaced: the next incremental run starts over
+            os.remove(state_path)
+        summary = (
+            f"Successfully exported {len(tables) - failed - skipped} tables as {file_format} to the Landing Zone: {folder_path} "
+            f"({workers} workers, {skipped} unchanged, {failed} failed). Manifest: {manifest_path}"
+        )
+        return "\n".join([summary] + report)
     except Exception as e:
         return f"❌ Error exporting tables: {str(e)}"
 
@@ -46,19 +550,28 @@ data_extraction_agent = Agent(
         You are responsible for ensuring raw data integrity by exporting all tables from the database into a secure 
         Landing Zone folder. You identify all tables, extract data, and store them as CSV files while maintaining completeness.
     """),
-    llm="groq/llama-3.3-70b-versatile",
+    llm=CachedLLM(
+        model="groq/llama-3.3-70b-versatile",
+        api_key=config.settings.groq_api_key,
+        cache_path=config.settings.llm_cache_path,
+        cache_max_bytes=config.settings.llm_cache_max_bytes,
+        cache_mode=config.settings.llm_cache_mode,
+        rate_limiter=config.rate_limiter,
+    ),
     tools=[export_tables_to_landing_zone],
     allow_delegation=False,
 )
 
 # Task: Export Data to Landing Zone
 data_landing_zone_task = Task(
-    description="Export all database tables into a Landing Zone folder as CSV files.",
+    description="Export all database tables into the Landing Zone folder `./Landing_zone/{database}` as CSV files.",
     expected_output=dedent("""
         All database tables have been exported to the Landing Zone folder.
         The output includes:
         - Table names
-        - Path to each exported CSV file
+        - Path to each exported file
+        - Rows and bytes written per table
+        - Path to the Landing Zone manifest
         """),
     agent=data_extraction_agent,
     config={"folder_path": "./Landing_zone"}  # Default folder path for Landing Zone
@@ -72,19 +585,15 @@ landing_zone_crew = Crew(
     verbose=True
 )
 
-# Rate Limiting Guard
-def rate_limit_guard():
-    """Waits for the rate limit window to reset."""
-    print("⏳ Rate limit reached. Waiting for 60 seconds...")
-    time.sleep(60)
-
 # Main Execution
 if __name__ == "__main__":
     print("🚀 Starting Data Landing Zone Creation...")
+    inputs = {"database": get_engine().url.database}
     try:
-        result = landing_zone_crew.kickoff()
+        result = landing_zone_crew.kickoff(inputs=inputs)
         print("✅ Landing Zone Creation Completed!")
         print(result)
     except Exception as e:
         print(f"❌ Error occurred: {e}")
-        rate_limit_guard()
+        if config.rate_limiter.backoff(e):  # Retry transient failures once
+            print(landing_zone_crew.kickoff(inputs=inputs))
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from crewai import LLM
+from rate_limiter import estimate_tokens
+import tracing
+
+# Request parameters that change the response, in addition to the model and messages
+CACHED_PARAMS = (
+    "temperature", "top_p", "n", "stop", "max_tokens", "max_completion_tokens", "presence_penalty",
+    "frequency_penalty", "logit_bias", "response_format", "seed", "logprobs", "top_logprobs",
+)
+# Call arguments that do not change the response, left out of the cache key
+UNCACHED_ARGUMENTS = ("callbacks",)
+
+
+def count_tokens(model: str, messages=None, text: str = None) -> int:
+    """Counts tokens with the model's tokenizer through litellm, or estimates them without it."""
+    try:
+        from litellm import token_counter
+
+        if messages is not None:
+            return token_counter(model=model, messages=messages)
+        return token_counter(model=model, text=text)
+    except Exception:
+        return estimate_tokens(messages if messages is not None else text or "")
+
+
+class CacheMiss(RuntimeError):
+    """Raised in replay mode when a request has no cached response."""
+
+
+class ResponseCache:
+    """
+    Exact-match LLM response cache stored in a local SQLite file.
+
+    Entries are evicted least-recently-used once the stored responses exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, created_at REAL, last_used REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(model: str, messages, params: dict, args: tuple = (), kwargs: dict = None) -> str:
+        """
+        Hashes a request: the model, messages, request parameters and the call's own arguments,
+        such as the tools or functions crewAI passes. Functions are identified by their name.
+        """
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "params": params,
+                "args": list(args),
+                "kwargs": {name: value for name, value in (kwargs or {}).items() if name not in UNCACHED_ARGUMENTS},
+            },
+            sort_keys=True,
+            default=lambda value: getattr(value, "__qualname__", None) or str(value),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self._connect() as connection:
+            row = connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return None if row is None else row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                # Drop the least recently used entries until the cache fits again
+                excess = total - self.max_bytes
+                freed = 0
+                stale = []
+                for entry_key, entry_size in connection.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                    if freed >= excess:
+                        break
+                    stale.append((entry_key,))
+                    freed += entry_size
+                connection.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+
+class CachedLLM(LLM):
+    """
+    `crewai.LLM` with an exact-match response cache keyed on the model, messages and request parameters.
+
+    Modes:
+        - "off": every call goes to the provider.
+        - "read_write": cached responses are reused, misses are fetched and stored.
+        - "replay": only cached responses are served, a miss raises `CacheMiss` instead of calling
+          the provider, so runs are deterministic and need no network.
+
+    Calls that reach the provider go through `rate_limiter` when one is given, so they respect the
+    shared request and token budgets and transient failures are retried with backoff.
+    """
+
+    def __init__(self, *args, cache_path: str = ".llm_cache.sqlite", cache_max_bytes: int = 200_000_000, cache_mode: str = "read_write", rate_limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+        if cache_mode not in ("off", "read_write", "replay"):
+            raise ValueError(f"Unknown LLM cache mode '{cache_mode}'")
+        self.cache_mode = cache_mode
+        self.response_cache = ResponseCache(cache_path, cache_max_bytes) if cache_mode != "off" else None
+
+    def _provider_call(self, messages, *args, **kwargs):
+        if self.rate_limiter is None:
+            return super().call(messages, *args, **kwargs)
+        # The prompt is reserved up front; the completion is charged once its size is known
+        response = self.rate_limiter.call(super().call, messages, *args, tokens=estimate_tokens(messages), **kwargs)
+        self.rate_limiter.charge(count_tokens(self.model, text=response if isinstance(response, str) else str(response)))
+        return response
+
+    def _cached_call(self, messages, *args, **kwargs) -> tuple:
+        """Returns the response and whether it came from the cache."""
+        if self.response_cache is None:
+            return self._provider_call(messages, *args, **kwargs), False
+
+        params = {name: getattr(self, name, None) for name in CACHED_PARAMS}
+        key = ResponseCache.key(self.model, messages, params, args, kwargs)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached, True
+        if self.cache_mode == "replay":
+            raise CacheMiss(f"No cached response for this {self.model} request (replay mode)")
+
+        response = self._provider_call(messages, *args, **kwargs)
+        if isinstance(response, str):
+            self.response_cache.put(key, self.model, response)
+        return response, False
+
+    def call(self, messages, *args, **kwargs):
+        with tracing.span(self.model, "llm", model=self.model) as span:
+            response, cached = self._cached_call(messages, *args, **kwargs)
+            span.set(
+                cached=cached,
+                prompt_tokens=count_tokens(self.model, messages=messages),
+                completion_tokens=count_tokens(self.model, text=response) if isinstance(response, str) else None,
+            )
+        return response
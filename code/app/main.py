@@ -1,23 +1,26 @@
 import yaml
 from crewai import Agent, Crew, Task, Process
-from tools import list_tables, tables_schema, execute_sql, check_sql
+from tools import list_tables, tables_schema, schema_digest, execute_sql, check_sql
+from integrity import check_foreign_key_integrity
+from profiling import profile_tables
+from fix_executor import apply_fixes
+from scheduler import plan_parallel_tasks
 import config
-import time
 
 llm = config.llm
 
-def rate_limit_guard():
-    print("Rate limit hit. Retrying in 60 seconds...")
-    time.sleep(60)
-
 with open("config.yaml", "r") as file:
     yaml_config = yaml.safe_load(file)
 
 tools = {
     "list_tables": list_tables,
     "tables_schema": tables_schema,
+    "schema_digest": schema_digest,
     "execute_sql": execute_sql,
-    "check_sql": check_sql
+    "check_sql": check_sql,
+    "check_foreign_key_integrity": check_foreign_key_integrity,
+    "profile_tables": profile_tables,
+    "apply_fixes": apply_fixes,
 }
 
 # Define Agents
@@ -27,7 +30,7 @@ sql_dev = Agent(
     goal="Construct and execute SQL queries to analyze and validate the database schema and data.",
     backstory=yaml_config["agents"]["sql_dev"]["backstory"],
     llm=llm,
-    tools=[tools["list_tables"], tools["tables_schema"], tools["execute_sql"], tools["check_sql"]],
+    tools=[tools["list_tables"], tools["schema_digest"], tools["tables_schema"], tools["execute_sql"], tools["check_sql"]],
     allow_delegation=False,
 )
 
@@ -37,7 +40,7 @@ data_validator = Agent(
     goal="Detect and validate data issues and provide detailed quality statistics.",
     backstory=yaml_config["agents"]["data_validator"]["backstory"],
     llm=llm,
-    tools=[],  
+    tools=[tools["profile_tables"]],
     allow_delegation=False,
 )
 
@@ -47,7 +50,7 @@ schema_validator = Agent(
     goal="Ensure schema relationships are logically consistent and aligned with real-world business rules.",
     backstory=yaml_config["agents"]["schema_validator"]["backstory"],
     llm=llm,
-    tools=[tools["list_tables"], tools["tables_schema"]],  
+    tools=[tools["list_tables"], tools["schema_digest"], tools["tables_schema"], tools["check_foreign_key_integrity"]],
     allow_delegation=False,
 )
 
@@ -57,7 +60,7 @@ database_expert = Agent(
     goal="Fix database issues and save the corrected database into a new one.",
     backstory=yaml_config["agents"]["database_expert"]["backstory"],
     llm=llm,
-    tools=[tools["execute_sql"], tools["check_sql"]],
+    tools=[tools["apply_fixes"], tools["execute_sql"], tools["check_sql"]],
     allow_delegation=False,
 )
     
@@ -67,7 +70,7 @@ prompt_modifier = Agent(
     goal="Incorporate user modifications (ground truth relationships) into validation prompts and regenerate SQL queries.",
     backstory=yaml_config["agents"]["prompt_modifier"]["backstory"],
     llm=llm,
-    tools=[tools["tables_schema"]],  
+    tools=[tools["schema_digest"], tools["tables_schema"]],
     allow_delegation=False,
 )
 
@@ -131,7 +134,11 @@ summarize_results = Task(
 
 crew = Crew(
     agents=[sql_dev, data_validator, schema_validator, database_expert, prompt_modifier, report_writer],
-    tasks=[generate_sql, validate_data, validate_schema, generate_fix_sql, apply_ground_truth, summarize_results],
+    # Independent tasks (validate_data and validate_schema) run concurrently, derived from each task's context
+    tasks=plan_parallel_tasks(
+        [generate_sql, validate_data, validate_schema, generate_fix_sql, apply_ground_truth, summarize_results],
+        config.settings.crew_max_parallel_tasks,
+    ),
     process=Process.sequential,
     verbose=True,
     output_log_file="crew.log",
@@ -1,44 +1,284 @@
+import hashlib
+import heapq
+import os
+import tempfile
+from decimal import Decimal
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect, text
 from crewai_tools import tool
 from crewai import Agent, Task, Crew, Process
-from config import llm, db
+from config import llm
+from schema_snapshot import get_schema_snapshot
+from engines import get_engine
+from table_chunks import read_table_chunks
 import config
 
-db_engine = create_engine(config.DB_URI)
+
+def _outlier_columns(table_name: str) -> tuple:
+    """
+    Splits the columns of a table into numerical feature columns and primary-key columns.
+    Primary-key columns are used to identify rows, not as features.
+
+    Returns:
+        tuple: Feature column names and key column names.
+    """
+    inspector = inspect(get_engine())
+    keys = inspector.get_pk_constraint(table_name).get("constrained_columns") or []
+    features = []
+    for column in inspector.get_columns(table_name):
+        try:
+            python_type = column["type"].python_type
+        except NotImplementedError:
+            continue
+        if python_type in (int, float, Decimal) and column["name"] not in keys:
+            features.append(column["name"])
+    return features, keys
+
+
+def _sample_rows(table_name: str, columns: str, sample_size: int, rows: int) -> tuple:
+    """
+    Reads a bounded random sample of a table of `rows` rows (an exact count: the
+    `information_schema` estimate is often stale or 0 for freshly loaded tables).
+
+    Small tables are read in full. Larger ones are filtered server-side with a seeded
+    `RAND() < fraction`, a single scan without the sort `ORDER BY RAND()` would need, and
+    trimmed at random to `sample_size` rows.
+
+    Returns:
+        tuple: The sampled rows and whether they are the whole table.
+    """
+    with get_engine().connect() as connection:
+        if rows <= sample_size:
+            return pd.read_sql(text(f"SELECT {columns} FROM `{table_name}`"), connection), True
+
+        # Oversample slightly so the filter rarely keeps fewer than `sample_size` rows. A LIMIT
+        # would keep the rows the scan reaches first, so the excess is dropped at random instead
+        fraction = min(1.0, 1.2 * sample_size / rows)
+        sample = pd.read_sql(
+            text(f"SELECT {columns} FROM `{table_name}` WHERE RAND(42) < :fraction"),
+            connection,
+            params={"fraction": fraction},
+        )
+        if len(sample) > sample_size:
+            sample = sample.sample(n=sample_size, random_state=42).sort_index().reset_index(drop=True)
+        return sample, False
+
+
+def _score_chunk(model, chunk: pd.DataFrame, features: list, fill_values: pd.Series, keys: list, offset: int, top_k: int) -> tuple:
+    """
+    Scores one chunk of rows.
+
+    Returns:
+        tuple: Number of outliers in the chunk and its `top_k` most anomalous rows as (score, id) pairs.
+    """
+    scores = model.decision_function(chunk[features].astype(float).fillna(fill_values))
+    outliers = int((scores < 0).sum())
+
+    candidates = np.argpartition(scores, top_k - 1)[:top_k] if len(scores) > top_k else np.arange(len(scores))
+    top = []
+    for position in candidates:
+        if len(keys) == 1:
+            row_id = chunk[keys[0]].iloc[position]
+        elif keys:
+            row_id = tuple(chunk[keys].iloc[position])
+        else:
+            row_id = f"row #{offset + position}"
+        top.append((float(scores[position]), row_id))
+    return outliers, top
+
+
+def _score_rows(model, chunks, features: list, fill_values: pd.Series, keys: list, top_k: int, offset: int = 0) -> tuple:
+    """
+    Scores an iterable of row chunks.
+
+    Returns:
+        tuple: Rows scored, outliers found and the `top_k` most anomalous rows as (score, id) pairs.
+    """
+    scored_rows = 0
+    outlier_count = 0
+    top = []
+    for chunk in chunks:
+        outliers, chunk_top = _score_chunk(model, chunk, features, fill_values, keys, offset + scored_rows, top_k)
+        outlier_count += outliers
+        scored_rows += len(chunk)
+        top = heapq.nsmallest(top_k, top + chunk_top, key=lambda item: item[0])
+    return scored_rows, outlier_count, top
+
+
+def _stream_rows(connection, table_name: str, columns: str, keys: list, where: str = "", params: dict = None):
+    """Reads rows of a table in `outlier_chunk_size` chunks, streamed or paged by primary key."""
+    return read_table_chunks(connection, table_name, columns, keys, config.settings.outlier_chunk_size, where, params)
+
+
+def _data_fingerprint(connection, table_name: str, columns: list, key: str = None, max_key=None) -> dict:
+    """
+    Fingerprints the analyzed columns of a table: row count, an order-independent
+    checksum of their values and, for single-column keys, the highest key.
+    With `max_key` only rows up to that key are fingerprinted.
+    """
+    values = ", ".join(f"IFNULL(`{column}`, 'NULL')" for column in columns)
+    query = f"SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', {values}))), 0)"
+    query += f", MAX(`{key}`)" if key else ", NULL"
+    query += f" FROM `{table_name}`"
+    params = {}
+    if key and max_key is not None:
+        query += f" WHERE `{key}` <= :max_key"
+        params["max_key"] = max_key
+
+    rows, checksum, highest = connection.execute(text(query), params).fetchone()
+    return {"rows": int(rows), "checksum": int(checksum), "max_key": highest}
+
+
+def _model_cache_path(table_name: str, features: list) -> str:
+    """Cache file for a table of the current database and its numeric-column signature."""
+    signature = hashlib.sha1("|".join([get_engine().url.database or "", table_name] + features).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(config.settings.outlier_model_cache_dir, f"{table_name}-{signature}.joblib")
+
+
+def _load_cached_model(path: str):
+    """Loads a cached model entry and marks it as recently used."""
+    import joblib
+
+    if not os.path.exists(path):
+        return None
+    try:
+        entry = joblib.load(path)
+        os.utime(path)
+    except Exception:  # Unreadable, or evicted meanwhile by another writer
+        return None
+    return entry
+
+
+def _save_cached_model(path: str, entry: dict):
+    """Persists a model entry, evicting the least recently used entries beyond `outlier_model_cache_size`."""
+    import joblib
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A temporary file of its own, so concurrent writers of the same entry never share one
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+    os.close(descriptor)
+    try:
+        joblib.dump(entry, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    # Best effort: other sessions and batch runs share the directory and may evict the same files
+    cache_dir = os.path.dirname(path)
+    files = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".joblib"):
+            try:
+                files.append((os.path.getmtime(os.path.join(cache_dir, name)), name))
+            except FileNotFoundError:
+                continue
+    for _, name in sorted(files, reverse=True)[max(1, config.settings.outlier_model_cache_size):]:
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass
 
 
 @tool("detect_outliers_with_isolation_forest")
-def detect_outliers_with_isolation_forest(table_name: str) -> str:
+def detect_outliers_with_isolation_forest(table_name: str, top_k: int = 10) -> str:
     """
     Detects outliers in numerical data from the specified table using Isolation Forest.
 
+    The model is fitted on a bounded random sample of the table, then the whole table is
+    streamed through it in chunks, so memory use does not grow with the size of the table.
+    Fitted models are cached on disk per table and numeric-column signature, together with
+    a fingerprint of the data: an unchanged table is answered from the cache, and a table
+    that only gained rows reuses the model and scores just the new rows.
+
     Args:
         table_name (str): Table name to analyze.
+        top_k (int): Number of most anomalous rows to report.
 
     Returns:
-        str: Summary of detected outliers.
+        str: Summary of detected outliers, with the IDs of the most anomalous rows and the cache status.
     """
+    from sklearn.ensemble import IsolationForest
+
     try:
-        # Load data
-        query = f"SELECT * FROM {table_name}"
-        df = pd.read_sql(query, db_engine)
+        features, keys = _outlier_columns(table_name)
+        if not features:
+            return f"⚠ Table '{table_name}' has no numerical columns for outlier detection."
 
-        if df.empty:
-            return f"❌ No data found in table '{table_name}'."
+        columns = ", ".join(f"`{column}`" for column in keys + features)
+        key = keys[0] if len(keys) == 1 else None
+        top_k = max(1, top_k)
+        cache_path = _model_cache_path(table_name, features)
 
-        numerical_data = df.select_dtypes(include=["number"])
+        with get_engine().connect() as connection:
+            fingerprint = _data_fingerprint(connection, table_name, keys + features, key)
+            entry = _load_cached_model(cache_path)
+            if entry and top_k > entry["top_capacity"]:
+                entry = None
 
-        if numerical_data.empty:
-            return f"⚠ Table '{table_name}' has no numerical columns for outlier detection."
+            if entry and entry["fingerprint"] == fingerprint:
+                cache_status = "hit"
+            elif (
+                entry
+                and key
+                and entry["fingerprint"]["max_key"] is not None
+                and _data_fingerprint(connection, table_name, keys + features, key, entry["fingerprint"]["max_key"])
+                == entry["fingerprint"]
+            ):
+                # Rows already scored are unchanged: reuse the model and score only the new ones
+                chunks = _stream_rows(
+                    connection, table_name, columns, keys, f"`{key}` > :max_key", {"max_key": entry["fingerprint"]["max_key"]}
+                )
+                new_rows, new_outliers, new_top = _score_rows(
+                    entry["model"], chunks, features, entry["fill_values"], keys, entry["top_capacity"]
+                )
+                entry["scored_rows"] += new_rows
+                entry["outlier_count"] += new_outliers
+                entry["top"] = heapq.nsmallest(entry["top_capacity"], entry["top"] + new_top, key=lambda item: item[0])
+                entry["fingerprint"] = fingerprint
+                cache_status = f"partial hit, scored {new_rows} new rows"
+            else:
+                # Fit on a bounded sample
+                sample, full_table = _sample_rows(table_name, columns, config.settings.outlier_sample_size, fingerprint["rows"])
+                if sample.empty:
+                    return f"❌ No data found in table '{table_name}'."
+
+                fill_values = sample[features].astype(float).median()
+                model = IsolationForest(
+                    contamination=config.settings.outlier_contamination,
+                    random_state=42,
+                    n_jobs=config.settings.outlier_n_jobs,
+                )
+                model.fit(sample[features].astype(float).fillna(fill_values))
+
+                # Score every row; a table that fit in the sample was already read in full
+                top_capacity = max(top_k, 100)
+                chunks = [sample] if full_table else _stream_rows(connection, table_name, columns, keys)
+                scored_rows, outlier_count, top = _score_rows(model, chunks, features, fill_values, keys, top_capacity)
+                entry = {
+                    "model": model,
+                    "fill_values": fill_values,
+                    "sample_rows": len(sample),
+                    "scored_rows": scored_rows,
+                    "outlier_count": outlier_count,
+                    "top": top,
+                    "top_capacity": top_capacity,
+                    "fingerprint": fingerprint,
+                }
+                cache_status = "miss"
 
-        # Use Isolation Forest for outlier detection
-        model = IsolationForest(contamination=0.01, random_state=42)
-        df['outlier'] = model.fit_predict(numerical_data)
+        if cache_status != "hit":
+            _save_cached_model(cache_path, entry)
 
-        outlier_count = (df['outlier'] == -1).sum()
-        return f"✅ Detected {outlier_count} outliers in table '{table_name}' using Isolation Forest."
+        top = entry["top"][:top_k]
+        top_rows = ", ".join(f"{row_id} (score {score:.3f})" for score, row_id in top)
+        return (
+            f"✅ Detected {entry['outlier_count']} outliers in table '{table_name}' using Isolation Forest "
+            f"(fitted on {entry['sample_rows']} sampled rows, scored {entry['scored_rows']} rows, "
+            f"model cache {cache_status}).\n"
+            f"Top {len(top)} anomalous rows by {', '.join(keys) or 'position'}: {top_rows}"
+        )
     except Exception as e:
         return f"❌ Error detecting outliers in table '{table_name}': {str(e)}"
 
@@ -52,12 +292,12 @@ def validate_schema() -> str:
         str: Summary of schema validation results.
     """
     try:
-        inspector = inspect(db_engine)
-        tables = inspector.get_table_names()
+        snapshot = get_schema_snapshot(get_engine())
+        tables = snapshot.table_names()
         schema_summary = "Database Schema Validation Results:\n"
 
         for table in tables:
-            fkeys = inspector.get_foreign_keys(table)
+            fkeys = snapshot.foreign_keys[table]
             schema_summary += f"Table '{table}':\n"
             if fkeys:
                 schema_summary += f"  Foreign Keys: {fkeys}\n"
@@ -95,7 +335,7 @@ schema_validation_task = Task(
 outlier_detection_task = Task(
     name="outlier_detection_task",
     description="Detect outliers in numerical data from a specific table using Isolation Forest.",
-    expected_output="Summary of detected outliers using Isolation Forest.",
+    expected_output="Summary of detected outliers using Isolation Forest, including the IDs of the most anomalous rows.",
     agent=advanced_validator,
     config={"table_name": "passenger"} 
 )
@@ -1,11 +1,188 @@
 from crewai import Agent, Task, Crew, Process
 from crewai_tools import tool
 from config import llm 
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import text, inspect
 from crewai_tools import tool
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
+from engines import get_engine, dispose_engine
 import config
 
-db_engine = create_engine(config.DB_URI)
+
+PROGRESS_TABLE = "_copy_progress"
+DEFERRED_INDEX_PREFIXES = ("KEY ", "INDEX ", "UNIQUE KEY ", "UNIQUE INDEX ", "FULLTEXT KEY ", "SPATIAL KEY ")
+
+
+# ---------------------- COPY ENGINE ----------------------
+def _split_create_statement(create_sql: str) -> tuple:
+    """
+    Splits a `SHOW CREATE TABLE` statement into the parts applied at different stages of the copy.
+
+    Returns:
+        tuple: The CREATE TABLE statement with columns, primary key and checks only,
+            the secondary index clauses and the foreign key clauses.
+    """
+    lines = create_sql.splitlines()
+    header, footer = lines[0], lines[-1]
+    kept, indexes, foreign_keys = [], [], []
+
+    for line in lines[1:-1]:
+        clause = line.strip().rstrip(",")
+        if clause.startswith(DEFERRED_INDEX_PREFIXES):
+            indexes.append(clause)
+        elif clause.startswith("CONSTRAINT") and " FOREIGN KEY " in clause:
+            foreign_keys.append(clause)
+        else:
+            kept.append(f"  {clause}")
+
+    return "\n".join([header, ",\n".join(kept), footer]), indexes, foreign_keys
+
+
+def _index_name(clause: str) -> str:
+    """Name of the index or constraint defined by a `SHOW CREATE TABLE` clause, e.g. "KEY `idx_name` (`col`)"."""
+    match = re.search(r"`((?:[^`]|``)+)`", clause)
+    return match.group(1).replace("``", "`") if match else None
+
+
+def _copy_waves(inspector, tables: list) -> list:
+    """
+    Orders tables into waves following foreign keys: every table comes after the tables it references.
+    Tables within a wave have no dependency on each other and can be copied concurrently.
+    Tables caught in a reference cycle are put together in a final wave.
+
+    Returns:
+        list: Lists of table names, one per wave.
+    """
+    parents = {
+        table: {
+            fk["referred_table"]
+            for fk in inspector.get_foreign_keys(table)
+            if fk["referred_table"] in tables and fk["referred_table"] != table and not fk.get("referred_schema")
+        }
+        for table in tables
+    }
+
+    waves = []
+    remaining = set(tables)
+    while remaining:
+        wave = sorted(table for table in remaining if not parents[table] & remaining)
+        if not wave:
+            wave = sorted(remaining)
+        waves.append(wave)
+        remaining -= set(wave)
+    return waves
+
+
+def _load_progress(engine) -> dict:
+    """
+    Reads the copy progress recorded in the target database.
+
+    Returns:
+        dict: Table name to its progress row, or None when no copy is in progress.
+    """
+    if PROGRESS_TABLE not in inspect(engine).get_table_names():
+        return None
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT table_name, stage, next_key, rows_copied FROM `{PROGRESS_TABLE}`"))
+        return {row.table_name: row._asdict() for row in rows}
+
+
+def _set_progress(conn, table: str, stage: str, next_key=None, rows_copied: int = 0):
+    """Records the progress of a table, in the same transaction as the work it describes."""
+    conn.execute(
+        text(
+            f"INSERT INTO `{PROGRESS_TABLE}` (table_name, stage, next_key, rows_copied) "
+            "VALUES (:table, :stage, :next_key, :rows_copied) "
+            "ON DUPLICATE KEY UPDATE stage = VALUES(stage), next_key = VALUES(next_key), rows_copied = VALUES(rows_copied)"
+        ),
+        {"table": table, "stage": stage, "next_key": None if next_key is None else str(next_key), "rows_copied": rows_copied},
+    )
+
+
+def _copy_table(table: str, source_db: str, new_engine, plan: dict, progress: dict, batch_size: int) -> tuple:
+    """
+    Creates a table in the target database, loads it and builds its secondary indexes,
+    resuming from `progress` when a previous copy was interrupted.
+
+    Rows are moved with batched `INSERT ... SELECT` statements over ranges of the first
+    primary-key column; each batch commits together with its progress row, so no batch is ever
+    copied twice. With a composite key a batch holds every row sharing its lower bound, so it
+    may exceed `batch_size`. Tables without a primary key are copied in one statement.
+
+    Returns:
+        tuple: Rows copied and seconds spent.
+    """
+    started = time.perf_counter()
+    stage = progress.get("stage")
+    rows_copied = progress.get("rows_copied") or 0
+
+    if stage is None:
+        with new_engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS `{table}`"))
+            conn.execute(text(plan["create"]))
+            _set_progress(conn, table, "loading")
+        stage = "loading"
+
+    if stage == "loading":
+        source = f"`{source_db}`.`{table}`"
+        columns = plan["columns"]
+        key = plan["key"]
+        next_key = progress.get("next_key")
+
+        while True:
+            with new_engine.begin() as conn:
+                conditions, params = [], {}
+                upper = None
+                if key:
+                    offset = batch_size
+                    if next_key is not None:
+                        conditions.append(f"`{key}` >= :lower")
+                        params["lower"] = next_key
+                        # The next bound is searched past this one, which a composite key may repeat, so every batch advances
+                        offset = max(batch_size - 1, 0)
+                    where = f" WHERE `{key}` > :lower" if conditions else ""
+                    upper = conn.execute(
+                        text(f"SELECT `{key}` FROM {source}{where} ORDER BY `{key}` LIMIT 1 OFFSET :offset"),
+                        {**params, "offset": offset},
+                    ).scalar()
+                    if upper is not None:
+                        conditions.append(f"`{key}` < :upper")
+                        params["upper"] = upper
+
+                where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+                result = conn.execute(
+                    text(f"INSERT INTO `{table}` ({columns}) SELECT {columns} FROM {source}{where}"),
+                    params,
+                )
+                rows_copied += result.rowcount
+                next_key = upper
+                _set_progress(conn, table, "loading" if upper is not None else "loaded", next_key, rows_copied)
+
+            if upper is None:
+                break
+        stage = "loaded"
+
+    if stage == "loaded":
+        with new_engine.begin() as conn:
+            # DDL commits on its own: after a crash the indexes may exist while the progress says "loaded"
+            existing = set(conn.execute(
+                text(
+                    "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+                ),
+                {"table": table},
+            ).scalars())
+            indexes = [index for index in plan["indexes"] if _index_name(index) not in existing]
+            if indexes:
+                conn.execute(text(f"ALTER TABLE `{table}` " + ", ".join(f"ADD {index}" for index in indexes)))
+            _set_progress(conn, table, "indexed", None, rows_copied)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Table '{table}' copied ({rows_copied} rows, {elapsed:.1f}s)")
+    return rows_copied, elapsed
+
+
 # ---------------------- TOOLS ----------------------
 @tool("copy_database")
 def copy_database(new_db_name: str) -> str:
@@ -13,6 +190,11 @@ def copy_database(new_db_name: str) -> str:
     Creates a new database, copies all tables and their data from the existing database,
     and applies corrections.
 
+    The full table definitions are reproduced (primary keys, secondary indexes and foreign keys).
+    Tables are copied concurrently in foreign-key order, in primary-key batches, with secondary
+    indexes and foreign keys added after the data is loaded. Progress is recorded in the new
+    database, so running the tool again after an interruption resumes the copy.
+
     Args:
         new_db_name (str): The name for the new database.
 
@@ -20,27 +202,94 @@ def copy_database(new_db_name: str) -> str:
         str: Success message or an error message if the operation fails.
     """
     try:
-        current_engine = db_engine
+        current_engine = get_engine()
+        source_db = current_engine.url.database
         with current_engine.connect() as connection:
-            connection.execute(text(f"CREATE DATABASE IF NOT EXISTS {new_db_name}"))
+            connection.execute(text(f"CREATE DATABASE IF NOT EXISTS `{new_db_name}`"))
             print(f"✅ Database '{new_db_name}' created successfully!")
 
+        workers = max(1, config.settings.copy_max_workers)
         new_db_url = current_engine.url.set(database=new_db_name)
-        new_engine = create_engine(new_db_url)
+        new_engine = get_engine(new_db_url)
 
-        inspector = inspect(current_engine)
-        tables = inspector.get_table_names()
+        try:
+            inspector = inspect(current_engine)
+            tables = inspector.get_table_names()
 
-        for table in tables:
+            progress = _load_progress(new_engine)
+            if progress is None:
+                existing = set(tables) & set(inspect(new_engine).get_table_names())
+                if existing:
+                    return (
+                        f"❌ Database '{new_db_name}' already contains tables {sorted(existing)} "
+                        "and has no copy in progress to resume."
+                    )
+                with new_engine.begin() as conn:
+                    conn.execute(text(
+                        f"CREATE TABLE `{PROGRESS_TABLE}` ("
+                        "table_name VARCHAR(64) PRIMARY KEY, stage VARCHAR(16) NOT NULL, next_key TEXT NULL, "
+                        "rows_copied BIGINT NOT NULL DEFAULT 0)"
+                    ))
+                progress = {}
+            else:
+                print(f"🔁 Resuming copy into '{new_db_name}' ({len(progress)} tables already started)")
+
+            plans = {}
             with current_engine.connect() as conn:
-                copy_query = f"CREATE TABLE {new_db_name}.{table} AS SELECT * FROM {table}"
-                conn.execute(text(copy_query))
-                print(f"✅ Table '{table}' copied successfully to '{new_db_name}'.")
+                for table in tables:
+                    create_sql = conn.execute(text(f"SHOW CREATE TABLE `{table}`")).fetchone()[1]
+                    create, indexes, foreign_keys = _split_create_statement(create_sql)
+                    primary_key = inspector.get_pk_constraint(table).get("constrained_columns") or []
+                    plans[table] = {
+                        "create": create,
+                        "indexes": indexes,
+                        "foreign_keys": foreign_keys,
+                        "key": primary_key[0] if primary_key else None,
+                        "columns": ", ".join(
+                            f"`{column['name']}`" for column in inspector.get_columns(table) if not column.get("computed")
+                        ),
+                    }
+
+            report = []
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copy") as executor:
+                for wave in _copy_waves(inspector, tables):
+                    pending = [table for table in wave if progress.get(table, {}).get("stage") not in ("indexed", "done")]
+                    futures = {
+                        table: executor.submit(
+                            _copy_table,
+                            table,
+                            source_db,
+                            new_engine,
+                            plans[table],
+                            progress.get(table, {}),
+                            config.settings.copy_batch_size,
+                        )
+                        for table in pending
+                    }
+                    for table, future in futures.items():
+                        rows, elapsed = future.result()
+                        unbatched = " (no primary key, copied in one statement)" if plans[table]["key"] is None else ""
+                        report.append(f"- {table}: {rows} rows in {elapsed:.1f}s{unbatched}")
 
-        current_engine.dispose()
-        new_engine.dispose()
+            # Foreign keys last, once every referenced table is loaded and indexed
+            with new_engine.begin() as conn:
+                existing = set(conn.execute(text(
+                    "SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+                )).tuples())
+                for table in tables:
+                    if progress.get(table, {}).get("stage") == "done":
+                        continue
+                    foreign_keys = [fk for fk in plans[table]["foreign_keys"] if (table, _index_name(fk)) not in existing]
+                    if foreign_keys:
+                        conn.execute(text(f"ALTER TABLE `{table}` " + ", ".join(f"ADD {fk}" for fk in foreign_keys)))
+                    _set_progress(conn, table, "done")
+                conn.execute(text(f"DROP TABLE `{PROGRESS_TABLE}`"))
+        finally:
+            # Only the target's pool is closed; the shared source engine stays open for other tools
+            dispose_engine(new_db_url)
 
-        return f"✅ The database has been successfully copied to '{new_db_name}'."
+        return "\n".join([f"✅ The database has been successfully copied to '{new_db_name}'."] + report)
     except Exception as e:
         return f"❌ Error saving the database: {str(e)}"
 
@@ -60,10 +309,9 @@ database_expert = Agent(
 
 save_corrected_db = Task(
     name="save_corrected_db",
-    description="Create a new database named 'fixed_<source_db>' and copy all tables into it.",
+    description="Create a new database named 'fixed_{database}' and copy all tables into it.",
     expected_output="The corrected database has been saved successfully.",
     agent=database_expert,
-    config={"new_db_name": "fixed_airportdb"},
 )
 
 new_db_crew = Crew(
@@ -75,6 +323,6 @@ new_db_crew = Crew(
 
 if __name__ == "__main__":
     print("🚀 Starting New Database Creation Pipeline...")
-    result = new_db_crew.kickoff()
+    result = new_db_crew.kickoff(inputs={"database": get_engine().url.database})
     print(result)
     print("✅ New database creation pipeline completed successfully!")
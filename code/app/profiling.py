@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+from crewai_tools import tool
+from sqlalchemy import text
+from schema_snapshot import get_schema_snapshot
+from engines import get_engine
+import config
+
+
+# Columns only profiled for NULLs: comparing or de-duplicating them is expensive or unsupported
+UNCOMPARABLE_TYPES = {
+    "tinyblob", "blob", "mediumblob", "longblob", "json",
+    "geometry", "point", "linestring", "polygon", "multipoint", "multilinestring", "multipolygon", "geometrycollection",
+}
+
+
+def _profile_query(snapshot, table: str) -> tuple:
+    """
+    Builds the single aggregate statement that profiles every column of a table at once.
+
+    Returns:
+        tuple: The SQL statement and the profiled columns.
+    """
+    columns = snapshot.columns[table]
+    select = ["COUNT(*) AS row_count"]
+    for index, column in enumerate(columns):
+        name = f"`{column['name']}`"
+        select.append(f"SUM({name} IS NULL) AS c{index}_nulls")
+        if column["data_type"] not in UNCOMPARABLE_TYPES:
+            select.append(f"COUNT(DISTINCT {name}) AS c{index}_distinct")
+            select.append(f"MIN({name}) AS c{index}_min")
+            select.append(f"MAX({name}) AS c{index}_max")
+
+    # Duplicate rows are rows identical on every column except the primary key
+    primary_key = set(snapshot.primary_keys[table])
+    compared = [
+        f"`{column['name']}`" for column in columns
+        if column["name"] not in primary_key and column["data_type"] not in UNCOMPARABLE_TYPES
+    ]
+    if compared:
+        select.append(
+            f"COUNT(*) - (SELECT COUNT(*) FROM (SELECT DISTINCT {', '.join(compared)} FROM `{table}`) d) AS duplicate_rows"
+        )
+    else:
+        select.append("0 AS duplicate_rows")
+
+    return f"SELECT {', '.join(select)} FROM `{table}`", columns
+
+
+def _profile_table(snapshot, table: str) -> dict:
+    """
+    Profiles one table with a single statement.
+
+    Returns:
+        dict: Row count, duplicate row count and per-column null count, distinct count, min and max.
+    """
+    query, columns = _profile_query(snapshot, table)
+    # The snapshot's engine, not get_engine(): worker threads do not see the database bound by the caller
+    with snapshot.engine.connect() as connection:
+        row = connection.execute(text(query)).mappings().one()
+
+    rows = row["row_count"]
+    profile = {"rows": rows, "duplicate_rows": int(row["duplicate_rows"] or 0), "columns": {}}
+    for index, column in enumerate(columns):
+        nulls = int(row[f"c{index}_nulls"] or 0)
+        profile["columns"][column["name"]] = {
+            "nulls": nulls,
+            "null_pct": round(100 * nulls / rows, 2) if rows else 0.0,
+            "distinct": row.get(f"c{index}_distinct"),
+            "min": row.get(f"c{index}_min"),
+            "max": row.get(f"c{index}_max"),
+        }
+    return profile
+
+
+def profile_database(tables: list = None) -> dict:
+    """
+    Profiles the given tables (all tables by default), running up to `profiling_max_workers` tables in parallel.
+
+    Returns:
+        dict: Table name to its profile, or to {"error": message} if profiling it failed.
+    """
+    snapshot = get_schema_snapshot(get_engine())
+    tables = tables or snapshot.table_names()
+
+    def profile(table):
+        try:
+            if table not in snapshot.tables:
+                return {"error": f"table '{table}' does not exist"}
+            return _profile_table(snapshot, table)
+        except Exception as e:
+            return {"error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=config.settings.profiling_max_workers, thread_name_prefix="profiling") as executor:
+        return dict(zip(tables, executor.map(profile, tables)))
+
+
+@tool("profile_tables")
+def profile_tables(tables: str = "") -> str:
+    """
+    Computes data quality metrics for every column of the given tables in one pass per table:
+    missing values, distinct values, min/max and duplicate rows.
+
+    Args:
+        tables (str): Comma-separated list of tables. Leave empty to profile all tables.
+
+    Returns:
+        str: Compact per-table, per-column quality metrics.
+    """
+    try:
+        table_names = [table.strip() for table in tables.split(",") if table.strip()]
+        profiles = profile_database(table_names)
+
+        lines = []
+        for table, profile in profiles.items():
+            if "error" in profile:
+                lines.append(f"❌ {table}: {profile['error']}")
+                continue
+            duplicate_pct = round(100 * profile["duplicate_rows"] / profile["rows"], 2) if profile["rows"] else 0.0
+            lines.append(f"{table}: {profile['rows']} rows, {profile['duplicate_rows']} duplicate rows ({duplicate_pct}%)")
+            for name, metrics in profile["columns"].items():
+                line = f"  {name}: nulls={metrics['nulls']} ({metrics['null_pct']}%)"
+                if metrics["distinct"] is not None:
+                    line += f", distinct={metrics['distinct']}, min={str(metrics['min'])[:40]}, max={str(metrics['max'])[:40]}"
+                lines.append(line)
+        return "\n".join(lines) if lines else "⚠ No tables found to profile."
+    except Exception as e:
+        return f"❌ Error profiling tables: {str(e)}"
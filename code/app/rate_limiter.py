@@ -0,0 +1,186 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and transient server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = ("RateLimit", "Timeout", "APIConnection", "ServiceUnavailable", "InternalServer")
+
+# Provider messages such as "Please try again in 7.5s", "in 1m2.5s" or "in 350ms"
+RETRY_HINT = re.compile(r"try again in\s+(?:(\d+)m(?!s))?\s*([\d.]+)\s*(ms|s)\b", re.IGNORECASE)
+
+
+def estimate_tokens(messages) -> int:
+    """Roughly estimates the tokens of a chat request (about four characters per token)."""
+    if isinstance(messages, str):
+        return max(1, len(messages) // 4)
+    return max(1, sum(len(str(message.get("content") or "")) for message in messages) // 4)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Tells whether an error is transient (rate limits, timeouts, 5xx) rather than a bug or bad request."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUSES:
+        return True
+    if any(name in type(error).__name__ for name in RETRYABLE_ERRORS):
+        return True
+    return "rate limit" in str(error).lower()
+
+
+def retry_after(error: Exception):
+    """
+    Extracts the provider's retry hint from an error: the `retry-after-ms` or `retry-after`
+    response headers, or a "try again in ..." message.
+
+    Returns:
+        float: Seconds to wait, or None when the error carries no hint.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None and hasattr(headers, "get"):
+        value = headers.get("retry-after-ms")
+        if value:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+    match = RETRY_HINT.search(str(error))
+    if match:
+        minutes, amount, unit = match.groups()
+        seconds = float(amount) / 1000 if unit.lower() == "ms" else float(amount)
+        return seconds + 60 * int(minutes or 0)
+    return None
+
+
+class RateLimiter:
+    """
+    Process-wide token-bucket limiter for LLM calls, shared by every crew.
+
+    Two buckets are refilled continuously: one for requests per minute and one for tokens per
+    minute. A call waits until both hold enough capacity. Failed calls are retried with
+    exponential backoff and full jitter, never sooner than the provider's retry-after hint.
+    Every wait has a blocking variant for worker threads and an async variant that never
+    blocks the event loop.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_retries: int = 5, backoff_base: float = 2.0, backoff_max: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Takes one request and `tokens` tokens if available, otherwise returns the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+            wait = 0.0
+            if self.requests_per_minute > 0 and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute > 0:
+                # A request larger than a minute's budget only has to wait for a full bucket
+                tokens = min(tokens, self.tokens_per_minute)
+                if self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if wait == 0.0:
+                self._requests -= 1
+                self._tokens -= tokens
+            return wait
+
+    def charge(self, tokens: int):
+        """
+        Takes tokens known only after a call, such as its completion tokens, from the token
+        bucket. The bucket may go below zero: later calls then wait until the debt is refilled.
+        """
+        if tokens <= 0 or self.tokens_per_minute <= 0:
+            return
+        with self._lock:
+            self._tokens -= tokens
+
+    def retry_delay(self, error: Exception, attempt: int):
+        """
+        Computes how long to wait before retrying a failed call.
+
+        Returns:
+            float: Seconds to wait, or None if the error is not transient or retries are exhausted.
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        hint = retry_after(error)
+        if hint is not None:
+            delay = max(delay, hint + random.uniform(0, self.backoff_base))
+        return delay
+
+    def acquire(self, tokens: int = 1):
+        """Blocks the calling thread until the request fits in the rate limits."""
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1):
+        """Waits without blocking the event loop until the request fits in the rate limits."""
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def backoff(self, error: Exception, attempt: int = 0) -> bool:
+        """Sleeps before a retry. Returns False, without sleeping, if the error should not be retried."""
+        delay = self.retry_delay(error, attempt)
+        if delay is None:
+            return False
+        print(f"⏳ Rate limited or transient error, retrying in {delay:.1f}s: {error}")
+        time.sleep(delay)
+        return True
+
+    async def backoff_async(self, error: Exception, attempt: int = 0) -> bool:
+        """Async variant of `backoff` that does not block the event loop."""
+        delay = self.retry_delay(error, attempt)
+        if delay is None:
+            return False
+        print(f"⏳ Rate limited or transient error, retrying in {delay:.1f}s: {error}")
+        await asyncio.sleep(delay)
+        return True
+
+    def call(self, function, *args, tokens: int = 1, **kwargs):
+        """Calls `function` within the rate limits, retrying transient failures."""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if not self.backoff(e, attempt):
+                    raise
+                attempt += 1
+
+    async def call_async(self, function, *args, tokens: int = 1, **kwargs):
+        """Async variant of `call`: runs the blocking `function` in a worker thread."""
+        attempt = 0
+        while True:
+            await self.acquire_async(tokens)
+            try:
+                return await asyncio.to_thread(function, *args, **kwargs)
+            except Exception as e:
+                if not await self.backoff_async(e, attempt):
+                    raise
+                attempt += 1
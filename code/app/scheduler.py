@@ -0,0 +1,108 @@
+import asyncio
+
+
+def _check_acyclic(dependencies: dict):
+    """Raises ValueError if the dependency graph has a cycle or names an unknown workflow."""
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Workflow dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dependency in dependencies.get(name, []):
+            if dependency not in dependencies:
+                raise ValueError(f"Workflow '{name}' depends on unknown workflow '{dependency}'")
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in dependencies:
+        visit(name, [])
+
+
+async def run_workflows(workflows: dict, dependencies: dict) -> dict:
+    """
+    Runs async workflows as a dependency graph: each one starts as soon as the workflows it
+    depends on have finished, so independent workflows run concurrently and the total time is
+    the critical path rather than the sum of all workflows.
+
+    Args:
+        workflows (dict): Workflow name to a coroutine function taking no arguments.
+        dependencies (dict): Workflow name to the names of the workflows it must wait for.
+
+    Returns:
+        dict: Workflow name to its result, or to the exception it raised.
+    """
+    graph = {name: list(dependencies.get(name, [])) for name in workflows}
+    _check_acyclic(graph)
+
+    tasks = {}
+
+    async def run(name):
+        # A failed dependency does not cancel its dependents: each workflow reports its own errors
+        await asyncio.gather(*(tasks[dependency] for dependency in graph[name]), return_exceptions=True)
+        return await workflows[name]()
+
+    for name in workflows:
+        tasks[name] = asyncio.create_task(run(name), name=name)
+
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    return dict(zip(tasks, results))
+
+
+def task_levels(tasks: list) -> list:
+    """
+    Groups crew tasks into dependency levels derived from their `context`: a task is one level
+    after the deepest task it reads from, so tasks in the same level never depend on each other.
+
+    Returns:
+        list: Lists of tasks, one per level, each keeping the original task order.
+    """
+    depth = {}
+    for task in tasks:
+        depth[id(task)] = 1 + max((depth.get(id(dependency), -1) for dependency in task.context or []), default=-1)
+    levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for task in tasks:
+        levels[depth[id(task)]].append(task)
+    return levels
+
+
+def plan_parallel_tasks(tasks: list, max_parallel: int) -> list:
+    """
+    Orders crew tasks by dependency level and sets `async_execution` so that independent tasks
+    run concurrently under `Process.sequential`.
+
+    A sequential crew starts async tasks in the background and waits for all of them at the next
+    sync task, so each batch of concurrent tasks is closed by a sync barrier: the first task of
+    the next level, a task reusing an agent already busy in the batch, or the task after
+    `max_parallel` concurrent ones. The crew ends with at most one async task, as crewAI requires.
+
+    Args:
+        tasks (list): Crew tasks, each listed after the tasks in its context.
+        max_parallel (int): Maximum number of tasks running at once. 1 keeps every task sync.
+
+    Returns:
+        list: The tasks in execution order.
+    """
+    ordered = []
+    pending = []
+    for level in task_levels(tasks):
+        for index, task in enumerate(level):
+            barrier = pending and (
+                index == 0
+                or len(pending) >= max_parallel
+                or any(task.agent is other.agent for other in pending)
+            )
+            if barrier or len(level) == 1 or max_parallel <= 1:
+                task.async_execution = False
+                pending = []
+            else:
+                task.async_execution = True
+                pending.append(task)
+            ordered.append(task)
+
+    if len(pending) > 1:
+        pending[-1].async_execution = False
+    return ordered
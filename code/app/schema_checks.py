@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# Columns that may hold a column's type in the schema metadata, in order of preference
+TYPE_COLUMNS = ("data_type", "column_type", "type")
+# Findings listed per check before the rest are only counted
+MAX_LISTED = 20
+
+
+def _normalize_type(types: pd.Series) -> pd.Series:
+    """Normalizes SQL types for comparison: lowercase, no spaces, no display width (`INT(11)` -> `int`)."""
+    # Schemas use few distinct types: normalize each once and map the codes back
+    codes, uniques = pd.factorize(types)
+    normalized = pd.Series(uniques, dtype="string").str.lower().str.replace(r"\s+", "", regex=True)
+    normalized = normalized.str.replace(r"^(tinyint|smallint|mediumint|int|integer|bigint)\(\d+\)", r"\1", regex=True)
+    return pd.Series(normalized.array.take(codes, allow_fill=True), index=types.index)
+
+
+def _findings(message: str, keys: pd.DataFrame, render) -> list:
+    """Formats one check's findings: a header with the count and up to `MAX_LISTED` examples."""
+    if keys.empty:
+        return []
+    lines = [f"{message} ({len(keys)}):"]
+    lines += [f"  - {render(row)}" for row in keys.head(MAX_LISTED).itertuples(index=False)]
+    if len(keys) > MAX_LISTED:
+        lines.append(f"  ... and {len(keys) - MAX_LISTED} more")
+    return lines
+
+
+def _encode(*series: pd.Series) -> list:
+    """Encodes several string columns with one shared vocabulary, so they compare as integers."""
+    codes, _ = pd.factorize(pd.concat(series, ignore_index=True))
+    return np.split(codes, np.cumsum([len(item) for item in series])[:-1])
+
+
+def check_schema_metadata(schema_df: pd.DataFrame, foreign_keys_df: pd.DataFrame, primary_keys_df: pd.DataFrame) -> list:
+    """
+    Validates schema metadata with set operations on integer-encoded names only, so the cost
+    grows linearly with the number of rows.
+
+    Checks foreign keys whose table, column, referred table or referred column is missing,
+    foreign keys not referring to a primary key, tables without a primary key, primary key
+    columns missing from the schema, and foreign key / primary key type mismatches.
+
+    Args:
+        schema_df (pd.DataFrame): One row per column: `table_name`, `column_name` and optionally its type.
+        foreign_keys_df (pd.DataFrame): `table_name`, `column_name`, `referred_table`, `referred_column`.
+        primary_keys_df (pd.DataFrame): `table_name`, `column_name`.
+
+    Returns:
+        list: Report lines, empty when no problem was found.
+    """
+    type_column = next((name for name in TYPE_COLUMNS if name in schema_df.columns), None)
+    schema = schema_df.drop_duplicates(["table_name", "column_name"])
+    foreign_keys = foreign_keys_df[["table_name", "column_name", "referred_table", "referred_column"]].drop_duplicates().reset_index(drop=True)
+    primary_keys = primary_keys_df[["table_name", "column_name"]].drop_duplicates().reset_index(drop=True)
+
+    # Table and column names as integers; a (table, column) pair as one integer key
+    schema_table, fk_table, fk_referred_table, pk_table = _encode(
+        schema["table_name"], foreign_keys["table_name"], foreign_keys["referred_table"], primary_keys["table_name"]
+    )
+    schema_column, fk_column, fk_referred_column, pk_column = _encode(
+        schema["column_name"], foreign_keys["column_name"], foreign_keys["referred_column"], primary_keys["column_name"]
+    )
+    # Larger than every column code, so distinct pairs never share a key
+    width = int(max((codes.max() for codes in (schema_column, fk_column, fk_referred_column, pk_column) if len(codes)), default=0)) + 1
+    schema_keys = pd.Index(schema_table.astype(np.int64) * width + schema_column)
+    fk_keys = fk_table.astype(np.int64) * width + fk_column
+    fk_referred_keys = fk_referred_table.astype(np.int64) * width + fk_referred_column
+    pk_keys = pk_table.astype(np.int64) * width + pk_column
+    tables = np.unique(schema_table)
+    first_of_table = ~pd.Series(schema_table).duplicated().to_numpy()
+    schema_tables = schema.loc[first_of_table, ["table_name"]]
+
+    # Foreign keys: both ends must exist, with matching types
+    child_position = schema_keys.get_indexer(fk_keys)
+    parent_position = schema_keys.get_indexer(fk_referred_keys)
+    child_table_exists = np.isin(fk_table, tables)
+    parent_table_exists = np.isin(fk_referred_table, tables)
+    render = lambda row: f"{row.table_name}.{row.column_name} -> {row.referred_table}.{row.referred_column}"
+
+    lines = []
+    lines += _findings("❌ Foreign keys on missing tables", foreign_keys[~child_table_exists], render)
+    lines += _findings("❌ Foreign keys on missing columns", foreign_keys[child_table_exists & (child_position < 0)], render)
+    lines += _findings("❌ Foreign keys referring to missing tables", foreign_keys[~parent_table_exists], render)
+    lines += _findings("❌ Foreign keys referring to missing columns", foreign_keys[parent_table_exists & (parent_position < 0)], render)
+    lines += _findings(
+        "⚠ Foreign keys not referring to a primary key column",
+        foreign_keys[(parent_position >= 0) & ~np.isin(fk_referred_keys, pk_keys)],
+        render,
+    )
+
+    if type_column and not schema.empty:
+        # Blank type cells are read as NaN or NA; as "" they compare as plain strings and count as untyped
+        types = _normalize_type(schema[type_column].reset_index(drop=True)).fillna("").astype(str)
+        both = (child_position >= 0) & (parent_position >= 0)
+        child_type = types.take(np.where(both, child_position, 0)).to_numpy()
+        parent_type = types.take(np.where(both, parent_position, 0)).to_numpy()
+        typed = both & (child_type != "") & (parent_type != "")
+        mismatched = typed & (child_type != parent_type)
+        lines += _findings(
+            "❌ Foreign key / primary key type mismatches",
+            foreign_keys[mismatched].assign(type=child_type[mismatched], referred_type=parent_type[mismatched]),
+            lambda row: f"{row.table_name}.{row.column_name} ({row.type}) -> {row.referred_table}.{row.referred_column} ({row.referred_type})",
+        )
+
+    # Primary key coverage
+    lines += _findings(
+        "❌ Tables without a primary key",
+        schema_tables[~np.isin(schema_table[first_of_table], pk_table)],
+        lambda row: row.table_name,
+    )
+    lines += _findings(
+        "❌ Primary key columns missing from the schema",
+        primary_keys[~np.isin(pk_keys, schema_keys.to_numpy())],
+        lambda row: f"{row.table_name}.{row.column_name}",
+    )
+
+    lines += _findings(
+        "⚠ Tables without foreign keys",
+        schema_tables[~np.isin(schema_table[first_of_table], fk_table)],
+        lambda row: row.table_name,
+    )
+    return lines
@@ -0,0 +1,254 @@
+import threading
+import time
+from sqlalchemy import inspect, text
+import config
+
+
+class SchemaSnapshot:
+    """
+    In-memory snapshot of a database schema: tables, columns, primary keys, foreign keys and indexes.
+
+    The whole schema is loaded from `information_schema` in four set-based queries instead of
+    one reflection round trip per table. Foreign keys and indexes use the same dict layout as
+    the SQLAlchemy inspector, so callers can switch over without changing their output.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.database = engine.url.database
+        self.tables = {}
+        self.columns = {}
+        self.primary_keys = {}
+        self.foreign_keys = {}
+        self.indexes = {}
+        self.loaded_at = None
+        self._sample_rows = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Loads the schema of the engine's current database."""
+        if self.engine.dialect.name != "mysql":
+            return self._load_reflected()
+
+        with self.engine.connect() as connection:
+            tables = connection.execute(text(
+                "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME"
+            ))
+            self.tables = {row.TABLE_NAME: {"rows": row.TABLE_ROWS or 0} for row in tables}
+            self.columns = {table: [] for table in self.tables}
+            self.primary_keys = {table: [] for table in self.tables}
+            self.foreign_keys = {table: [] for table in self.tables}
+            self.indexes = {table: [] for table in self.tables}
+
+            columns = connection.execute(text(
+                "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA "
+                "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+                "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+            ))
+            for row in columns:
+                if row.TABLE_NAME in self.tables:
+                    self.columns[row.TABLE_NAME].append({
+                        "name": row.COLUMN_NAME,
+                        "type": row.COLUMN_TYPE,
+                        "data_type": row.DATA_TYPE,
+                        "nullable": row.IS_NULLABLE == "YES",
+                        "default": row.COLUMN_DEFAULT,
+                        "extra": row.EXTRA or "",
+                    })
+
+            statistics = connection.execute(text(
+                "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+            ))
+            indexes = {}
+            for row in statistics:
+                if row.TABLE_NAME not in self.tables:
+                    continue
+                if row.INDEX_NAME == "PRIMARY":
+                    self.primary_keys[row.TABLE_NAME].append(row.COLUMN_NAME)
+                    continue
+                index = indexes.setdefault((row.TABLE_NAME, row.INDEX_NAME), {
+                    "name": row.INDEX_NAME,
+                    "column_names": [],
+                    "unique": not int(row.NON_UNIQUE),
+                })
+                index["column_names"].append(row.COLUMN_NAME)
+            for (table, _), index in indexes.items():
+                self.indexes[table].append(index)
+
+            references = connection.execute(text(
+                "SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_SCHEMA, "
+                "k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME, r.UPDATE_RULE, r.DELETE_RULE "
+                "FROM information_schema.KEY_COLUMN_USAGE k "
+                "JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+                "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME "
+                "AND r.TABLE_NAME = k.TABLE_NAME "
+                "WHERE k.TABLE_SCHEMA = DATABASE() AND k.REFERENCED_TABLE_NAME IS NOT NULL "
+                "ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION"
+            ))
+            foreign_keys = {}
+            for row in references:
+                if row.TABLE_NAME not in self.tables:
+                    continue
+                foreign_key = foreign_keys.get((row.TABLE_NAME, row.CONSTRAINT_NAME))
+                if foreign_key is None:
+                    options = {}
+                    if row.UPDATE_RULE not in ("RESTRICT", "NO ACTION"):
+                        options["onupdate"] = row.UPDATE_RULE
+                    if row.DELETE_RULE not in ("RESTRICT", "NO ACTION"):
+                        options["ondelete"] = row.DELETE_RULE
+                    foreign_key = foreign_keys[(row.TABLE_NAME, row.CONSTRAINT_NAME)] = {
+                        "name": row.CONSTRAINT_NAME,
+                        "constrained_columns": [],
+                        "referred_schema": None if row.REFERENCED_TABLE_SCHEMA == self.database else row.REFERENCED_TABLE_SCHEMA,
+                        "referred_table": row.REFERENCED_TABLE_NAME,
+                        "referred_columns": [],
+                        "options": options,
+                    }
+                foreign_key["constrained_columns"].append(row.COLUMN_NAME)
+                foreign_key["referred_columns"].append(row.REFERENCED_COLUMN_NAME)
+            for (table, _), foreign_key in foreign_keys.items():
+                self.foreign_keys[table].append(foreign_key)
+
+        self._sample_rows = {}
+        self.loaded_at = time.monotonic()
+        return self
+
+    def _load_reflected(self):
+        """
+        Loads the schema through the SQLAlchemy inspector, for databases without MySQL's
+        `information_schema` such as the SQLite stores of uploaded CSV files.
+        """
+        with self.engine.connect() as connection:
+            inspector = inspect(connection)
+            names = sorted(inspector.get_table_names())
+            self.tables = {
+                table: {"rows": connection.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar() or 0}
+                for table in names
+            }
+            self.columns, self.primary_keys, self.foreign_keys, self.indexes = {}, {}, {}, {}
+            for table in names:
+                self.columns[table] = [
+                    {
+                        "name": column["name"],
+                        "type": str(column["type"]).lower(),
+                        "data_type": str(column["type"]).lower().split("(")[0],
+                        "nullable": column["nullable"],
+                        "default": column.get("default"),
+                        "extra": "",
+                    }
+                    for column in inspector.get_columns(table)
+                ]
+                self.primary_keys[table] = inspector.get_pk_constraint(table).get("constrained_columns") or []
+                self.foreign_keys[table] = inspector.get_foreign_keys(table)
+                self.indexes[table] = [
+                    {"name": index["name"], "column_names": index["column_names"], "unique": bool(index["unique"])}
+                    for index in inspector.get_indexes(table)
+                ]
+
+        self._sample_rows = {}
+        self.loaded_at = time.monotonic()
+        return self
+
+    def table_names(self) -> list:
+        """Returns the names of all base tables, sorted."""
+        return list(self.tables)
+
+    def sample_rows(self, table: str, limit: int = 3) -> tuple:
+        """
+        Returns the column names and the first `limit` rows of a table, fetched once per snapshot.
+        """
+        with self._lock:
+            cached = self._sample_rows.get((table, limit))
+        if cached is None:
+            with self.engine.connect() as connection:
+                result = connection.execute(text(f"SELECT * FROM `{table}` LIMIT {int(limit)}"))
+                cached = (list(result.keys()), [tuple(row) for row in result])
+            with self._lock:
+                self._sample_rows[(table, limit)] = cached
+        return cached
+
+    def create_table_statement(self, table: str) -> str:
+        """Renders a CREATE TABLE statement for a table from the snapshot."""
+        lines = []
+        for column in self.columns[table]:
+            line = f"\t`{column['name']}` {column['type'].upper()}"
+            if not column["nullable"]:
+                line += " NOT NULL"
+            if column["extra"]:
+                line += f" {column['extra'].upper()}"
+            lines.append(line)
+        if self.primary_keys[table]:
+            lines.append(f"\tPRIMARY KEY ({', '.join(f'`{name}`' for name in self.primary_keys[table])})")
+        for index in self.indexes[table]:
+            kind = "UNIQUE KEY" if index["unique"] else "KEY"
+            lines.append(f"\t{kind} `{index['name']}` ({', '.join(f'`{name}`' for name in index['column_names'])})")
+        for foreign_key in self.foreign_keys[table]:
+            line = (
+                f"\tFOREIGN KEY({', '.join(f'`{name}`' for name in foreign_key['constrained_columns'])}) "
+                f"REFERENCES `{foreign_key['referred_table']}` "
+                f"({', '.join(f'`{name}`' for name in foreign_key['referred_columns'])})"
+            )
+            for option, clause in (("onupdate", "ON UPDATE"), ("ondelete", "ON DELETE")):
+                if option in foreign_key["options"]:
+                    line += f" {clause} {foreign_key['options'][option]}"
+            lines.append(line)
+        return f"CREATE TABLE `{table}` (\n" + ", \n".join(lines) + "\n)"
+
+    def digest_line(self, table: str) -> str:
+        """
+        Describes a table on one line: columns with their types, primary key and foreign keys, e.g.
+        `booking(booking_id int PK, flight_id int, price decimal(10,2)) FK flight_id->flight.flight_id`.
+        """
+        primary_key = set(self.primary_keys[table])
+        columns = ", ".join(
+            f"{column['name']} {column['type']}" + (" PK" if column["name"] in primary_key else "")
+            for column in self.columns[table]
+        )
+        line = f"{table}({columns})"
+        if self.foreign_keys[table]:
+            line += " FK " + ", ".join(
+                f"{','.join(fk['constrained_columns'])}->{fk['referred_table']}.{','.join(fk['referred_columns'])}"
+                for fk in self.foreign_keys[table]
+            )
+        return line
+
+    def table_info(self, table: str, sample_rows: int = 3) -> str:
+        """
+        Describes a table the way `InfoSQLDatabaseTool` does: its CREATE TABLE statement
+        followed by a few sample rows.
+        """
+        info = self.create_table_statement(table)
+        if sample_rows > 0:
+            names, rows = self.sample_rows(table, sample_rows)
+            body = "\n".join("\t".join(str(value)[:100] for value in row) for row in rows)
+            info += f"\n\n/*\n{sample_rows} rows from {table} table:\n" + "\t".join(names) + f"\n{body}\n*/"
+        return info
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_schema_snapshot(engine, max_age: float = None) -> SchemaSnapshot:
+    """
+    Returns the cached schema snapshot for an engine, loading it when missing or older than
+    `max_age` seconds (`schema_snapshot_ttl` by default).
+    """
+    max_age = config.settings.schema_snapshot_ttl if max_age is None else max_age
+    key = engine.url.render_as_string(hide_password=False)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > max_age:
+            snapshot = _snapshots[key] = SchemaSnapshot(engine).load()
+        return snapshot
+
+
+def invalidate_schema_snapshot(engine=None):
+    """Drops the cached snapshot of an engine, or of every engine when none is given."""
+    with _snapshots_lock:
+        if engine is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(engine.url.render_as_string(hide_password=False), None)
@@ -0,0 +1,102 @@
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import ParseError
+except ImportError:  # Optional: without sqlglot every check falls back to the LLM checker
+    sqlglot = None
+
+VALID = "valid"
+INVALID = "invalid"
+INCONCLUSIVE = "inconclusive"
+
+# Statements whose table and column references can be checked against the schema
+CHECKED_STATEMENTS = ("Select", "Union", "Intersect", "Except", "Insert", "Update", "Delete")
+
+
+def validate_sql(sql_query: str, snapshot) -> tuple:
+    """
+    Checks a MySQL statement locally: parses it and verifies the tables and columns it
+    references against the schema snapshot.
+
+    Args:
+        sql_query (str): Statement to check.
+        snapshot (SchemaSnapshot): Schema to check references against.
+
+    Returns:
+        tuple: One of VALID, INVALID or INCONCLUSIVE, and a list of problems found.
+            INCONCLUSIVE means the statement could not be fully checked locally.
+    """
+    if sqlglot is None:
+        return INCONCLUSIVE, ["sqlglot is not installed"]
+
+    try:
+        statements = [statement for statement in sqlglot.parse(sql_query, read="mysql") if statement is not None]
+    except ParseError as e:
+        return INVALID, [f"Syntax error: {error['description']} (line {error['line']}, column {error['col']})" for error in e.errors] or [str(e)]
+
+    if len(statements) != 1:
+        return INCONCLUSIVE, ["expected exactly one statement"]
+    statement = statements[0]
+    if type(statement).__name__ not in CHECKED_STATEMENTS:
+        return INCONCLUSIVE, [f"{type(statement).__name__} statements are not checked locally"]
+
+    tables = {name.lower(): name for name in snapshot.table_names()}
+    columns = {
+        table.lower(): {column["name"].lower() for column in snapshot.columns[table]}
+        for table in snapshot.table_names()
+    }
+
+    # Names that are not base tables but can be referenced like one
+    derived = {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+    derived |= {subquery.alias.lower() for subquery in statement.find_all(exp.Subquery) if subquery.alias}
+    aliases = {alias.alias.lower() for alias in statement.find_all(exp.Alias)}
+
+    # Table aliases, which MySQL multi-table DELETE and UPDATE name as targets: `DELETE b FROM booking b ...`
+    table_aliases = {table.alias.lower() for table in statement.find_all(exp.Table) if table.alias}
+
+    problems = []
+    inconclusive = []
+    sources = {}
+    external = set()
+    for table in statement.find_all(exp.Table):
+        name = table.name.lower()
+        if not name or name == "dual" or name in derived:
+            continue
+        if not table.db and not table.alias and name in table_aliases:
+            continue
+        if table.db and table.db.lower() != (snapshot.database or "").lower():
+            inconclusive.append(f"table '{table.db}.{table.name}' is in another database")
+            external.add(table.alias_or_name.lower())
+            continue
+        if name not in tables:
+            problems.append(f"Table '{table.name}' does not exist")
+            continue
+        sources[table.alias_or_name.lower()] = name
+
+    referenced = set(sources.values())
+    for column in statement.find_all(exp.Column):
+        if isinstance(column.this, exp.Star):
+            continue
+        name = column.name.lower()
+        qualifier = column.table.lower()
+        if qualifier:
+            if qualifier in derived or qualifier in external:
+                continue
+            if qualifier not in sources:
+                if qualifier not in tables:
+                    problems.append(f"Unknown table or alias '{column.table}' in '{column.sql(dialect='mysql')}'")
+                continue
+            if name not in columns[sources[qualifier]]:
+                problems.append(f"Column '{column.name}' does not exist in table '{tables[sources[qualifier]]}'")
+        elif name not in aliases and not any(name in columns[table] for table in referenced):
+            if derived or external:
+                inconclusive.append(f"column '{column.name}' may come from a derived table or a table in another database")
+            else:
+                problems.append(f"Column '{column.name}' does not exist in {sorted(tables[table] for table in referenced) or 'any referenced table'}")
+
+    # Anything left unresolved means the problems found may be wrong too: let the LLM checker decide
+    if inconclusive:
+        return INCONCLUSIVE, inconclusive + problems
+    if problems:
+        return INVALID, problems
+    return VALID, []
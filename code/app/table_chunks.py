@@ -0,0 +1,48 @@
+import pandas as pd
+from sqlalchemy import text
+
+
+def read_table_chunks(connection, table: str, columns: str, keys: list, chunk_size: int, where: str = "", params: dict = None):
+    """
+    Yields rows of a table as DataFrames of at most `chunk_size` rows, so memory use is bounded
+    by the chunk size rather than the size of the table.
+
+    Drivers with server-side cursors stream a single query. Others (e.g. mysql-connector) buffer
+    the whole result on `execute`, so there the table is paged by its primary key instead:
+    `WHERE (<where>) AND (<keys>) > (<last keys>) ORDER BY <keys> LIMIT <chunk_size>`, an index
+    range scan whichever page it reads. A table without primary key cannot be paged this way
+    and is read in one query.
+
+    Args:
+        connection: Connection to read with.
+        table (str): Table name.
+        columns (str): Select list; must include the `keys` columns.
+        keys (list): Primary-key column names of the table.
+        chunk_size (int): Rows per chunk. Zero or less reads everything at once.
+        where (str): Condition restricting the rows read.
+        params (dict): Parameters of `where`.
+    """
+    query = f"SELECT {columns} FROM `{table}`"
+    if chunk_size <= 0:
+        yield pd.read_sql(text(query + (f" WHERE {where}" if where else "")), connection, params=params)
+        return
+    if connection.dialect.supports_server_side_cursors or not keys:
+        connection = connection.execution_options(stream_results=True, max_row_buffer=chunk_size)
+        yield from pd.read_sql(text(query + (f" WHERE {where}" if where else "")), connection, params=params, chunksize=chunk_size)
+        return
+
+    key_list = ", ".join(f"`{key}`" for key in keys)
+    after = f"({key_list}) > ({', '.join(f':_last_{index}' for index in range(len(keys)))})"
+    last = None
+    while True:
+        conditions = ([f"({where})"] if where else []) + ([after] if last else [])
+        page = query + (f" WHERE {' AND '.join(conditions)}" if conditions else "") + f" ORDER BY {key_list} LIMIT {int(chunk_size)}"
+        result = connection.execute(text(page), {**(params or {}), **(last or {})})
+        names = list(result.keys())
+        rows = result.fetchall()
+        if not rows and last is not None:
+            return
+        yield pd.DataFrame.from_records(rows, columns=names, coerce_float=True)
+        if len(rows) < chunk_size:  # Also ends an empty table, yielded as one empty chunk like `pd.read_sql`
+            return
+        last = {f"_last_{index}": rows[-1][names.index(key)] for index, key in enumerate(keys)}
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The app modules are flat files run from code/app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings without defaults, so modules reading `config.settings` import without a .env file
+for name in ("GROQ_API_KEY", "AZURE_API_KEY", "AZURE_API_BASE", "AZURE_API_VERSION", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("DB_URI", "sqlite://")
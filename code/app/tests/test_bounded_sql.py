@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine, text
+
+pytest.importorskip("sqlglot")
+from bounded_sql import _bounded_statement, execute_bounded
+
+
+def _connection(name="mysql", server_side_cursors=False):
+    return SimpleNamespace(dialect=SimpleNamespace(name=name, supports_server_side_cursors=server_side_cursors))
+
+
+@pytest.mark.parametrize("query, bounded", [
+    ("SELECT * FROM booking", "SELECT * FROM booking\nLIMIT 11"),
+    ("SELECT * FROM booking;  ", "SELECT * FROM booking\nLIMIT 11"),
+    ("SELECT * FROM booking -- all of them", "SELECT * FROM booking -- all of them\nLIMIT 11"),
+    ("SELECT * FROM booking LIMIT 5", "SELECT * FROM booking LIMIT 5"),
+    ("SELECT * FROM booking LIMIT 11", "SELECT * FROM booking LIMIT 11"),
+    ("SELECT * FROM booking LIMIT 1000", "SELECT * FROM booking LIMIT 11"),
+    ("SELECT * FROM booking LIMIT 1000 OFFSET 20", "SELECT * FROM booking LIMIT 1000 OFFSET 20"),
+    ("SELECT * FROM booking FOR UPDATE", "SELECT * FROM booking FOR UPDATE"),
+    ("SELECT * FROM booking; SELECT * FROM flight", "SELECT * FROM booking; SELECT * FROM flight"),
+    ("SELECT * FROM", "SELECT * FROM"),
+])
+def test_buffering_drivers_get_a_limit(query, bounded):
+    assert _bounded_statement(_connection(), query, True, 10) == bounded
+
+
+def test_statements_left_unchanged():
+    query = "SELECT * FROM booking"
+    assert _bounded_statement(_connection(), "DELETE FROM booking", False, 10) == "DELETE FROM booking"
+    assert _bounded_statement(_connection("postgresql", server_side_cursors=True), query, True, 10) == query
+
+
+def test_execute_bounded_stops_at_the_row_limit(tmp_path):
+    # A file database, as stopping early drops the connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'bounded.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE booking (booking_id INTEGER PRIMARY KEY, price REAL)"))
+        connection.execute(text("INSERT INTO booking VALUES (:id, :price)"), [{"id": i, "price": i * 1.5} for i in range(1, 51)])
+
+    output = execute_bounded(engine, "SELECT * FROM booking", preview_rows=3, preview_bytes=1000, max_rows=10, max_bytes=10**6, timeout=30)
+
+    assert output.startswith("Columns: booking_id, price\n(1, 1.5)\n(2, 3.0)\n(3, 4.5)\n")
+    assert "Stopped at the row limit of 10 after 10 rows" in output
+    assert "- booking_id: 10 non-null, 0 null, 10 distinct, min 1, max 10, mean 5.5" in output
+
+    output = execute_bounded(engine, "SELECT * FROM booking WHERE booking_id <= 4", preview_rows=3, preview_bytes=1000, max_rows=10, max_bytes=10**6, timeout=30)
+    assert "-- Showing 3 of 4 rows" in output
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+pytest.importorskip("sqlglot")
+pytest.importorskip("crewai_tools")
+from fix_executor import _split_statements, _chunk_key, _key_ranges, _ranged
+from schema_snapshot import SchemaSnapshot
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('fixes') / 'airportdb.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE passenger (passenger_id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text(
+            "CREATE TABLE booking (booking_id INTEGER PRIMARY KEY, passenger_id INTEGER, price REAL, "
+            "FOREIGN KEY (passenger_id) REFERENCES passenger (passenger_id))"
+        ))
+        connection.execute(text("CREATE TABLE seat (flight_id INTEGER, seat TEXT, PRIMARY KEY (flight_id, seat))"))
+        connection.execute(text("INSERT INTO booking (booking_id, price) VALUES (:id, 1.0)"), [{"id": i} for i in range(1, 26)])
+    return engine
+
+
+@pytest.fixture(scope="module")
+def snapshot(engine):
+    return SchemaSnapshot(engine).load()
+
+
+def _parsed(sql, dialect="mysql"):
+    [(_, parsed)] = _split_statements(sql, dialect)
+    return parsed
+
+
+def test_statements_are_split_as_written():
+    script = (
+        "-- lead\nUPDATE t SET a = 'x;y' WHERE b REGEXP 'z' -- c;\n;"
+        " DELETE FROM t WHERE a NOT IN (1, 2);ALTER TABLE t MODIFY a INT; REPLACE INTO t VALUES (1) ;  "
+    )
+    statements = _split_statements(script, "mysql")
+
+    assert [sql for sql, _ in statements] == [
+        "UPDATE t SET a = 'x;y' WHERE b REGEXP 'z'",
+        "DELETE FROM t WHERE a NOT IN (1, 2)",
+        "ALTER TABLE t MODIFY a INT",
+        "REPLACE INTO t VALUES (1)",
+    ]
+    assert [type(parsed).__name__ for _, parsed in statements] == ["Update", "Delete", "NoneType", "NoneType"]
+
+
+def test_untokenizable_scripts_fall_back_to_semicolons():
+    assert _split_statements("UPDATE t SET a = 'open; DELETE FROM t", "mysql") == [
+        ("UPDATE t SET a = 'open", None),
+        ("DELETE FROM t", None),
+    ]
+
+
+@pytest.mark.parametrize("sql, key", [
+    ("UPDATE booking SET price = 0 WHERE price IS NULL", "booking_id"),
+    ("DELETE FROM Booking WHERE passenger_id IS NULL", "booking_id"),
+    ("UPDATE booking b SET b.price = 0", "booking_id"),
+    ("UPDATE booking b JOIN passenger p ON b.passenger_id = p.passenger_id SET b.price = 0", None),
+    ("DELETE b FROM booking b LEFT JOIN passenger p ON b.passenger_id = p.passenger_id WHERE p.passenger_id IS NULL", None),
+    ("DELETE FROM booking WHERE price IS NULL ORDER BY booking_id LIMIT 10", None),
+    ("UPDATE seat SET seat = 'A1'", None),
+    ("UPDATE missing SET a = 1", None),
+])
+def test_chunk_key(snapshot, sql, key):
+    chunk = _chunk_key(_parsed(sql), snapshot)
+    assert (chunk[1] if chunk else None) == key
+
+
+def test_ranged_keeps_the_condition_and_alias(snapshot):
+    statement = _parsed("UPDATE booking b SET b.price = 0 WHERE b.price IS NULL OR b.price < 0")
+    target, key = _chunk_key(statement, snapshot)
+
+    assert _ranged(statement, target, key, 10, 20, "mysql") == (
+        "UPDATE booking AS b SET b.price = 0 "
+        "WHERE (b.price IS NULL OR b.price < 0) AND `b`.`booking_id` >= 10 AND `b`.`booking_id` < 20"
+    )
+    assert _ranged(statement, target, key, None, 10, "mysql").endswith("WHERE (b.price IS NULL OR b.price < 0) AND `b`.`booking_id` < 10")
+
+    statement = _parsed("DELETE FROM booking")
+    target, key = _chunk_key(statement, snapshot)
+    assert _ranged(statement, target, key, 20, None, "mysql") == "DELETE FROM booking WHERE `booking`.`booking_id` >= 20"
+
+
+def test_key_ranges_cover_the_table(engine, snapshot):
+    statement = _parsed("DELETE FROM booking WHERE price < 0", "sqlite")
+    target, key = _chunk_key(statement, snapshot)
+
+    assert list(_key_ranges(engine, target, key, 10, "sqlite")) == [(None, 11), (11, 21), (21, None)]
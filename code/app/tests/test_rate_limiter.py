@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import pytest
+from rate_limiter import RateLimiter, estimate_tokens, is_retryable, retry_after
+
+
+class ProviderError(Exception):
+    """Error carrying an HTTP response, like the provider SDK errors."""
+
+    def __init__(self, message="", status_code=None, headers=None):
+        super().__init__(message)
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("x" * 40) == 10
+    assert estimate_tokens([{"role": "user", "content": "x" * 20}, {"role": "assistant", "content": None}]) == 5
+    assert estimate_tokens("") == 1
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (ProviderError(status_code=429), True),
+    (ProviderError(status_code=503), True),
+    (ProviderError(status_code=400), False),
+    (type("APITimeoutError", (Exception,), {})(), True),
+    (Exception("Rate limit reached for model"), True),
+    (ValueError("bad request"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+@pytest.mark.parametrize("error, seconds", [
+    (ProviderError(headers={"retry-after-ms": "1500", "retry-after": "9"}), 1.5),
+    (ProviderError(headers={"retry-after": "7"}), 7.0),
+    (ProviderError(headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0.0),
+    (Exception("Rate limit reached. Please try again in 7.5s."), 7.5),
+    (Exception("Please try again in 1m2.5s"), 62.5),
+    (Exception("Please try again in 350ms"), 0.35),
+    (Exception("Something else"), None),
+])
+def test_retry_after(error, seconds):
+    assert retry_after(error) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_reserve_waits_for_the_emptier_bucket():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+
+    assert limiter._reserve(300) == 0.0
+    # 200 more tokens than are left refill in 20 seconds at 10 tokens a second
+    assert limiter._reserve(500) == pytest.approx(20, abs=0.1)
+    # A request above a minute's budget only waits for a full bucket
+    assert limiter._reserve(10_000) == pytest.approx(30, abs=0.1)
+
+
+def test_charge_leaves_later_calls_waiting_for_the_debt():
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600)
+
+    limiter.charge(900)
+    assert limiter._reserve(1) == pytest.approx(30.1, abs=0.1)
+    limiter.charge(-5)
+    assert limiter._tokens == pytest.approx(-300, abs=1)
+
+
+def test_retry_delay_honours_hints_and_gives_up(monkeypatch):
+    limiter = RateLimiter(60, 600, max_retries=2, backoff_base=2.0, backoff_max=60.0)
+    monkeypatch.setattr("rate_limiter.random.uniform", lambda low, high: high)
+
+    assert limiter.retry_delay(ProviderError(status_code=429), 1) == 4.0
+    assert limiter.retry_delay(ProviderError("try again in 10s", status_code=429), 0) == 12.0
+    assert limiter.retry_delay(ProviderError(status_code=429), 2) is None
+    assert limiter.retry_delay(ValueError("bad request"), 0) is None
+
+
+def test_call_retries_transient_failures(monkeypatch):
+    limiter = RateLimiter(600, 60_000, max_retries=3)
+    monkeypatch.setattr("rate_limiter.time.sleep", lambda seconds: None)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ProviderError(status_code=503)
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 3
+
+    def invalid():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limiter.call(invalid)
+    assert len(attempts) == 4
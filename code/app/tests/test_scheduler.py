@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from scheduler import run_workflows, task_levels, plan_parallel_tasks
+
+
+def test_workflows_start_once_their_dependencies_finish():
+    events = []
+
+    def workflow(name, seconds):
+        async def run():
+            events.append(f"start {name}")
+            await asyncio.sleep(seconds)
+            events.append(f"end {name}")
+            return name
+        return run
+
+    workflows = {"landing_zone": workflow("landing_zone", 0.02), "validation": workflow("validation", 0.01), "ml_checks": workflow("ml_checks", 0.03)}
+    results = asyncio.run(run_workflows(workflows, {"validation": ["landing_zone"]}))
+
+    assert results == {"landing_zone": "landing_zone", "validation": "validation", "ml_checks": "ml_checks"}
+    # Independent workflows start together; a dependent one only after its dependency ended
+    assert events[:2] == ["start landing_zone", "start ml_checks"]
+    assert events.index("start validation") > events.index("end landing_zone")
+
+
+def test_a_failed_workflow_is_reported_without_cancelling_its_dependents():
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def succeed():
+        return "ok"
+
+    results = asyncio.run(run_workflows({"validation": fail, "new_db": succeed}, {"new_db": ["validation"]}))
+
+    assert isinstance(results["validation"], RuntimeError)
+    assert results["new_db"] == "ok"
+
+
+@pytest.mark.parametrize("dependencies, message", [
+    ({"a": ["b"], "b": ["a"]}, "cycle"),
+    ({"a": ["missing"]}, "unknown workflow"),
+])
+def test_invalid_dependency_graphs_are_rejected(dependencies, message):
+    async def noop():
+        return None
+
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(run_workflows({name: noop for name in dependencies}, dependencies))
+
+
+def _task(name, agent, *context):
+    return SimpleNamespace(name=name, agent=agent, context=list(context), async_execution=None)
+
+
+def _plan(tasks: list, max_parallel: int) -> list:
+    return [(task.name, task.async_execution) for task in plan_parallel_tasks(tasks, max_parallel)]
+
+
+def test_task_levels_follow_context():
+    generate = _task("generate", "sql_dev")
+    data = _task("data", "data_validator", generate)
+    schema = _task("schema", "schema_validator", generate)
+    report = _task("report", "writer", data, schema)
+
+    assert [[task.name for task in level] for level in task_levels([generate, data, schema, report])] == [
+        ["generate"], ["data", "schema"], ["report"],
+    ]
+
+
+def test_independent_tasks_run_async_until_the_next_level():
+    generate = _task("generate", "sql_dev")
+    data = _task("data", "data_validator", generate)
+    schema = _task("schema", "schema_validator", generate)
+    report = _task("report", "writer", data, schema)
+
+    assert _plan([generate, data, schema, report], 4) == [
+        ("generate", False), ("data", True), ("schema", True), ("report", False),
+    ]
+
+
+def test_a_shared_agent_or_the_parallel_limit_closes_a_batch():
+    generate = _task("generate", "sql_dev")
+    first = _task("first", "validator", generate)
+    second = _task("second", "validator", generate)
+    third = _task("third", "other", generate)
+    report = _task("report", "writer", first, second, third)
+
+    # The second task reuses the busy agent: it waits for the first one and starts a new batch
+    assert _plan([generate, first, second, third, report], 4) == [
+        ("generate", False), ("first", True), ("second", False), ("third", True), ("report", False),
+    ]
+    assert _plan([generate, first, second, third, report], 1) == [
+        ("generate", False), ("first", False), ("second", False), ("third", False), ("report", False),
+    ]
+
+
+def test_the_crew_never_ends_with_two_async_tasks():
+    generate = _task("generate", "sql_dev")
+    data = _task("data", "data_validator", generate)
+    schema = _task("schema", "schema_validator", generate)
+
+    assert _plan([generate, data, schema], 4) == [("generate", False), ("data", True), ("schema", False)]
@@ -0,0 +1,76 @@
+import io
+import pandas as pd
+from schema_checks import check_schema_metadata
+
+
+def _section(lines: list, header: str) -> list:
+    """Returns the items listed under a finding header, or [] when the check found nothing."""
+    for index, line in enumerate(lines):
+        if line.startswith(header):
+            items = []
+            for item in lines[index + 1:]:
+                if not item.startswith("  - "):
+                    break
+                items.append(item[4:])
+            return items
+    return []
+
+
+def test_pairs_are_distinct_with_more_column_names_than_rows():
+    # Eight distinct column names across the frames, but at most two rows in any one of them:
+    # (table, column) keys must not collide
+    schema = pd.DataFrame({"table_name": ["a", "b"], "column_name": ["c1", "c2"]})
+    foreign_keys = pd.DataFrame({
+        "table_name": ["a", "b"],
+        "column_name": ["c3", "c4"],
+        "referred_table": ["b", "a"],
+        "referred_column": ["c5", "c6"],
+    })
+    primary_keys = pd.DataFrame({"table_name": ["a", "b"], "column_name": ["c7", "c8"]})
+
+    lines = check_schema_metadata(schema, foreign_keys, primary_keys)
+
+    assert _section(lines, "❌ Foreign keys on missing columns") == ["a.c3 -> b.c5", "b.c4 -> a.c6"]
+    assert _section(lines, "❌ Foreign keys referring to missing columns") == ["a.c3 -> b.c5", "b.c4 -> a.c6"]
+    assert _section(lines, "❌ Primary key columns missing from the schema") == ["a.c7", "b.c8"]
+
+
+def test_valid_schema_reports_nothing():
+    schema = pd.DataFrame({
+        "table_name": ["parent", "child", "child"],
+        "column_name": ["id", "id", "parent_id"],
+        "data_type": ["INT(11)", "int", "int"],
+    })
+    foreign_keys = pd.DataFrame({
+        "table_name": ["child"], "column_name": ["parent_id"], "referred_table": ["parent"], "referred_column": ["id"],
+    })
+    primary_keys = pd.DataFrame({"table_name": ["parent", "child"], "column_name": ["id", "id"]})
+
+    lines = check_schema_metadata(schema, foreign_keys, primary_keys)
+
+    assert [line for line in lines if line.startswith("❌")] == []
+
+
+def test_blank_types_are_not_compared():
+    schema = pd.read_csv(io.StringIO("table_name,column_name,data_type\nparent,id,int\nchild,id,int\nchild,parent_id,\n"))
+    foreign_keys = pd.DataFrame({
+        "table_name": ["child"], "column_name": ["parent_id"], "referred_table": ["parent"], "referred_column": ["id"],
+    })
+    primary_keys = pd.DataFrame({"table_name": ["parent", "child"], "column_name": ["id", "id"]})
+
+    lines = check_schema_metadata(schema.astype({"data_type": "string"}), foreign_keys, primary_keys)
+    assert _section(lines, "❌ Foreign key / primary key type mismatches") == []
+    lines = check_schema_metadata(schema, foreign_keys, primary_keys)
+    assert _section(lines, "❌ Foreign key / primary key type mismatches") == []
+
+
+def test_empty_schema_reports_foreign_keys_on_missing_tables():
+    schema = pd.DataFrame({"table_name": [], "column_name": [], "data_type": []}, dtype=object)
+    foreign_keys = pd.DataFrame({
+        "table_name": ["child"], "column_name": ["parent_id"], "referred_table": ["parent"], "referred_column": ["id"],
+    })
+    primary_keys = pd.DataFrame({"table_name": [], "column_name": []}, dtype=object)
+
+    lines = check_schema_metadata(schema, foreign_keys, primary_keys)
+
+    assert _section(lines, "❌ Foreign keys on missing tables") == ["child.parent_id -> parent.id"]
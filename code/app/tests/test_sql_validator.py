@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, text
+from schema_snapshot import SchemaSnapshot
+from sql_validator import validate_sql, VALID, INVALID, INCONCLUSIVE
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE passenger (passenger_id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text(
+            "CREATE TABLE booking (booking_id INTEGER PRIMARY KEY, flight_id INTEGER, "
+            "passenger_id INTEGER REFERENCES passenger (passenger_id))"
+        ))
+    return SchemaSnapshot(engine).load()
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT b.booking_id, p.name FROM booking b JOIN passenger p ON b.passenger_id = p.passenger_id",
+    "WITH recent AS (SELECT booking_id FROM booking) SELECT booking_id FROM recent",
+    "UPDATE booking SET flight_id = 1 WHERE booking_id = 2",
+    "DELETE b FROM booking b LEFT JOIN passenger p ON b.passenger_id = p.passenger_id WHERE p.passenger_id IS NULL",
+])
+def test_known_tables_and_columns_are_valid(snapshot, sql_query):
+    assert validate_sql(sql_query, snapshot) == (VALID, [])
+
+
+@pytest.mark.parametrize("sql_query, problem", [
+    ("SELECT * FROM missing", "missing"),
+    ("SELECT nope FROM booking", "nope"),
+    ("SELECT b.nope FROM booking b", "nope"),
+    ("SELECT FROM WHERE", "Syntax error"),
+])
+def test_unknown_names_and_syntax_errors_are_invalid(snapshot, sql_query, problem):
+    status, problems = validate_sql(sql_query, snapshot)
+    assert status == INVALID
+    assert any(problem in item for item in problems)
+
+
+@pytest.mark.parametrize("sql_query", [
+    # Other databases and statements the schema snapshot cannot check
+    "SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS WHERE TABLE_NAME = 'booking'",
+    "SELECT c.COLUMN_NAME FROM information_schema.COLUMNS c WHERE c.TABLE_NAME = 'booking'",
+    "ALTER TABLE booking ADD COLUMN seat TEXT",
+    "SELECT 1; SELECT 2",
+])
+def test_statements_not_fully_resolved_are_inconclusive(snapshot, sql_query):
+    assert validate_sql(sql_query, snapshot)[0] == INCONCLUSIVE
+
+
+def test_check_sql_asks_the_llm_only_when_inconclusive(snapshot, monkeypatch):
+    tools = pytest.importorskip("tools")
+    asked = []
+
+    class Checker:
+        def invoke(self, arguments):
+            asked.append(arguments["query"])
+            return "checked by the LLM"
+
+    monkeypatch.setattr(tools, "get_engine", lambda url=None: snapshot.engine)
+    monkeypatch.setattr(tools, "get_schema_snapshot", lambda engine: snapshot)
+    monkeypatch.setattr(tools, "_sql_tools", lambda database_url: (None, Checker()))
+
+    assert tools.check_sql.run("SELECT name FROM passenger") == "SELECT name FROM passenger"
+    assert tools.check_sql.run("SELECT nope FROM passenger").startswith("Error:")
+    assert tools.check_sql.run("ALTER TABLE booking ADD COLUMN seat TEXT") == "checked by the LLM"
+    assert asked == ["ALTER TABLE booking ADD COLUMN seat TEXT"]
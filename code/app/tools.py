@@ -1,36 +1,222 @@
+import functools
+import threading
+from cachetools import TTLCache
 from crewai_tools import tool
-from langchain_community.tools.sql_database.tool import (
-    InfoSQLDatabaseTool,
-    ListSQLDatabaseTool,
-    QuerySQLCheckerTool,
-    QuerySQLDataBaseTool,
-)
-from crewai_tools import tool
-from config import  db, llm
+from bounded_sql import execute_bounded, SQLGLOT_DIALECTS
+from engines import get_engine
+from schema_snapshot import get_schema_snapshot, invalidate_schema_snapshot
+from sql_validator import validate_sql, VALID, INVALID
+import config
 import pandas as pd
 
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import SqlglotError
+except ImportError:  # Optional: without sqlglot, WITH statements are never treated as read-only
+    sqlglot = None
+
+READ_ONLY_STATEMENTS = {"select", "show", "describe", "desc", "explain"}
+
+
+class ResultCache:
+    """
+    Size-bounded TTL cache for tool results shared by every agent, with hit and miss counters.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute) -> str:
+        """Returns the cached result for `key`, or computes and caches it. Error results are not cached."""
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        result = compute()
+        if not (isinstance(result, str) and result.startswith("Error")):
+            with self._lock:
+                self._cache[key] = result
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+
+result_cache = ResultCache(maxsize=config.settings.tool_cache_size, ttl=config.settings.tool_cache_ttl)
+
+
+def _database_key() -> str:
+    """URL of the database the current call runs against (see `engines.bind_database`)."""
+    return get_engine().url.render_as_string(hide_password=False)
+
+
+@functools.lru_cache(maxsize=32)
+def _sql_tools(database_url: str) -> tuple:
+    """
+    Builds the LangChain SQL tools of a database on first use. They are stateless wrappers around
+    an `SQLDatabase`, so one of each is shared by every call against that database.
+
+    Returns:
+        tuple: The list tables and query checker tools.
+    """
+    from langchain_community.tools.sql_database.tool import ListSQLDatabaseTool, QuerySQLCheckerTool
+    from langchain_community.utilities.sql_database import SQLDatabase
+
+    db = SQLDatabase(get_engine(database_url))
+    return (
+        ListSQLDatabaseTool(db=db),
+        QuerySQLCheckerTool(db=db, llm=config.llm),
+    )
+
+
+# Tokenizer used to size schema digests, loaded on first use
+_encoding = None
+
+
+def normalize_sql(sql_query: str) -> str:
+    """Collapses whitespace and drops the trailing semicolon so equivalent queries share a cache entry."""
+    return " ".join(sql_query.split()).rstrip(";").strip()
+
+
+def is_read_only(sql_query: str, dialect: str = None) -> bool:
+    """
+    Whether a statement only reads data, judging by its first keyword. A `WITH` statement may
+    end in an UPDATE or DELETE (MySQL 8), so it is parsed and only a query counts as read-only.
+    """
+    keyword = normalize_sql(sql_query).split(" ", 1)[0].lower()
+    if keyword != "with":
+        return keyword in READ_ONLY_STATEMENTS
+    if sqlglot is None:
+        return False
+    try:
+        statements = sqlglot.parse(sql_query, read=SQLGLOT_DIALECTS.get(dialect, dialect))
+    except SqlglotError:
+        return False
+    statements = [statement for statement in statements if statement is not None]
+    return len(statements) == 1 and isinstance(statements[0], exp.Query)
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with the GPT-4o tokenizer, or estimates them at ~4 characters per token without tiktoken."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def cache_stats() -> dict:
+    """Hit and miss counters of the shared tool result cache, with the hit rate."""
+    stats = result_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+
 @tool("list_tables")
 def list_tables() -> str:
     """List the available tables in the database."""
-    return ListSQLDatabaseTool(db=db).invoke("")
+    return result_cache.get_or_compute((_database_key(), "list_tables"), lambda: _sql_tools(_database_key())[0].invoke(""))
 
 @tool("tables_schema")
 def tables_schema(tables: str) -> str:
     """
     Input is a comma-separated list of tables; output is the schema and sample rows.
     """
-    tool = InfoSQLDatabaseTool(db=db)
-    return tool.invoke(tables)
+    table_names = sorted({table.strip() for table in tables.split(",") if table.strip()})
+
+    def describe():
+        snapshot = get_schema_snapshot(get_engine())
+        missing = set(table_names) - set(snapshot.table_names())
+        if missing:
+            return f"Error: table_names {missing} not found in database"
+        return "\n\n".join(snapshot.table_info(table) for table in table_names)
+
+    return result_cache.get_or_compute((_database_key(), "tables_schema", tuple(table_names)), describe)
+
+@tool("schema_digest")
+def schema_digest(tables: str = "", token_budget: int = config.settings.schema_digest_token_budget, batch: int = 1) -> str:
+    """
+    Compact schema overview: one line per table with its columns, types, primary key and foreign keys.
+    Input is a comma-separated list of tables (empty for all tables). Tables are split into batches
+    that each fit in `token_budget` tokens; `batch` selects which batch to return, starting at 1.
+    """
+    table_names = sorted({table.strip() for table in tables.split(",") if table.strip()})
+
+    def digest():
+        snapshot = get_schema_snapshot(get_engine())
+        missing = set(table_names) - set(snapshot.table_names())
+        if missing:
+            return f"Error: table_names {missing} not found in database"
+
+        batches = [[]]
+        used = 0
+        for table in table_names or snapshot.table_names():
+            line = snapshot.digest_line(table)
+            tokens = count_tokens(line) + 1
+            if batches[-1] and used + tokens > token_budget:
+                batches.append([])
+                used = 0
+            batches[-1].append(line)
+            used += tokens
+
+        if not 1 <= batch <= len(batches):
+            return f"Error: batch {batch} out of range, there are {len(batches)} batches"
+        header = f"-- Schema digest, batch {batch} of {len(batches)}"
+        if batch < len(batches):
+            header += f" (call again with batch={batch + 1} for more tables)"
+        return "\n".join([header] + batches[batch - 1])
+
+    return result_cache.get_or_compute((_database_key(), "schema_digest", tuple(table_names), token_budget, batch), digest)
+
+def run_sql(sql_query: str) -> str:
+    """Runs a statement with bounded result handling, returning errors as text for the agent."""
+    try:
+        return execute_bounded(get_engine(), sql_query, is_select=normalize_sql(sql_query).split(" ", 1)[0].lower() in ("select", "with"))
+    except Exception as e:
+        return f"Error: {e}"
 
 @tool("execute_sql")
 def execute_sql(sql_query: str) -> str:
-    """Execute a SQL query against the database."""
-    return QuerySQLDataBaseTool(db=db).invoke(sql_query)
+    """
+    Execute a SQL query against the database. Large results are not returned in full: the output
+    is a preview of the first rows, the total row count and per-column statistics.
+    """
+    if is_read_only(sql_query, get_engine().dialect.name):
+        return result_cache.get_or_compute((_database_key(), "execute_sql", normalize_sql(sql_query)), lambda: run_sql(sql_query))
+
+    # DDL or DML: anything cached may now be stale
+    result = run_sql(sql_query)
+    result_cache.clear()
+    invalidate_schema_snapshot(get_engine())
+    return result
 
 @tool("check_sql")
 def check_sql(sql_query: str) -> str:
     """Check if the SQL query is correct."""
-    return QuerySQLCheckerTool(db=db, llm=llm).invoke({"query": sql_query})
+    # Parse and resolve names locally; only ask the LLM when that can't settle it
+    status, problems = validate_sql(sql_query, get_schema_snapshot(get_engine()))
+    if status == VALID:
+        return sql_query
+    if status == INVALID:
+        return "Error: " + "; ".join(problems)
+    return _sql_tools(_database_key())[1].invoke({"query": sql_query})
 
 @tool("read_schema_csv")
 def read_schema_csv(file_path: str) -> dict:
@@ -0,0 +1,250 @@
+import contextvars
+import copy
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+import config
+
+# Innermost open span of the current thread or asyncio task
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_lock = threading.Lock()
+# Finished spans of the traces whose root asked to collect them, kept in memory for the run summary
+_trace_spans = {}
+
+
+class Span:
+    """One timed operation. Spans are written as OTLP-style JSON objects, one per line."""
+
+    def __init__(self, name: str, kind: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start = time.time()
+        self.end = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def set(self, **attributes):
+        """Adds attributes to the span, e.g. row or token counts known only at the end."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": int(self.start * 1e9),
+            "end_time_unix_nano": int(self.end * 1e9),
+            "duration_ms": round(1000 * self.duration, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def _finish(span: Span):
+    if not config.settings.tracing_enabled:
+        return
+    line = json.dumps(span.to_dict(), default=str)
+    with _lock:
+        if span.trace_id in _trace_spans:
+            _trace_spans[span.trace_id].append(span)
+        if os.path.dirname(config.settings.trace_path):
+            os.makedirs(os.path.dirname(config.settings.trace_path), exist_ok=True)
+        with open(config.settings.trace_path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", collect: bool = False, **attributes):
+    """
+    Records a span around a block. It is nested under the current span, or starts a new trace
+    (a run) when there is none.
+
+    Args:
+        name (str): Name of the operation, e.g. the crew, task or tool name.
+        kind (str): One of "run", "crew", "task", "tool", "sql", "llm" or "internal".
+        collect (bool): For a new trace, keep its finished spans in memory until `summarize`
+            or `trace_spans` claims them. Other traces are only written to `trace_path`.
+        **attributes: Attributes stored with the span.
+    """
+    parent = _current_span.get()
+    current = Span(name, kind, parent, attributes)
+    if parent is None and collect:
+        with _lock:
+            _trace_spans[current.trace_id] = []
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set(error=str(e)[:500])
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end = time.time()
+        _finish(current)
+
+
+def record_span(name: str, kind: str, duration: float, **attributes) -> Span:
+    """Records a span that already finished, e.g. from a completion callback."""
+    finished = Span(name, kind, _current_span.get(), attributes)
+    finished.end = time.time()
+    finished.start = finished.end - duration
+    _finish(finished)
+    return finished
+
+
+def traced(name: str, kind: str):
+    """Decorator recording a span around every call of a function."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return function(*args, **kwargs)
+        wrapper.__traced__ = True
+        return wrapper
+    return decorate
+
+
+def bind_span(function, parent: Span):
+    """
+    Wraps a function so that, when it runs where no span is open (e.g. a thread that did not
+    inherit the caller's context), its spans nest under `parent`.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is not None:
+            return function(*args, **kwargs)
+        token = _current_span.set(parent)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+    return wrapper
+
+
+def bind_crew(crew, parent: Span):
+    """
+    Nests the task, tool and LLM spans of a crew copy under `parent`, including those recorded
+    in the threads crewAI starts for async tasks, which do not inherit the caller's context.
+    Tools and the LLM are shared with the original crew, so they are copied before binding.
+    """
+    for task in crew.tasks:
+        if task.callback is not None:
+            task.callback = bind_span(task.callback, parent)
+    for agent in crew.agents:
+        agent.tools = [
+            tool.model_copy(update={"func": bind_span(tool.func, parent)}) if getattr(tool, "func", None) else tool
+            for tool in agent.tools or []
+        ]
+        if agent.llm is not None and not isinstance(agent.llm, str):
+            agent.llm = copy.copy(agent.llm)
+            agent.llm.call = bind_span(agent.llm.call, parent)
+
+
+def instrument_crew(crew):
+    """
+    Adds task and tool spans to a crew: each task reports its duration through its completion
+    callback, and each tool function is wrapped in a span. Safe to call more than once.
+    """
+    for task in crew.tasks:
+        if getattr(task.callback, "__traced__", False):
+            continue
+
+        def callback(output, task=task, previous=task.callback):
+            record_span(task.name or task.description[:60], "task", getattr(task, "_execution_time", None) or 0.0, agent=output.agent)
+            if previous:
+                previous(output)
+
+        callback.__traced__ = True
+        task.callback = callback
+
+    for agent in crew.agents:
+        for tool in agent.tools or []:
+            function = getattr(tool, "func", None)
+            if function is not None and not getattr(function, "__traced__", False):
+                tool.func = traced(tool.name, "tool")(function)
+
+
+def instrument_engine(engine):
+    """Records a span for every SQL statement run on an engine, with the rows the driver reports."""
+    from sqlalchemy import event
+
+    # The start time lives on the statement's execution context, which a failing statement
+    # simply drops, rather than on the pooled connection
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._trace_started = time.time()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_trace_started", None)
+        if started is None:
+            return
+        record_span(
+            " ".join(statement.split())[:30], "sql", time.time() - started,
+            statement=" ".join(statement.split())[:1000],
+            rows=cursor.rowcount,
+            database=engine.url.database,
+        )
+
+
+def trace_spans(trace_id: str) -> list:
+    """Returns the finished spans of a trace and stops collecting them in memory."""
+    with _lock:
+        return _trace_spans.pop(trace_id, [])
+
+
+def summarize(trace_id: str, run: Span = None, top: int = 10) -> str:
+    """
+    Summarizes where a run spent its time: totals per span kind and the slowest spans.
+
+    Args:
+        trace_id (str): Trace of the run.
+        run (Span): The run's root span, to report the wall-clock time.
+        top (int): Number of slowest spans to list.
+
+    Returns:
+        str: A markdown timing summary.
+    """
+    spans = trace_spans(trace_id)
+    lines = []
+    if run is not None:
+        lines.append(f"**Wall-clock time:** {run.duration:.1f}s")
+
+    lines += ["", "| Kind | Count | Total (s) | Max (s) |", "| --- | --- | --- | --- |"]
+    for kind in ("crew", "task", "tool", "llm", "sql"):
+        durations = [item.duration for item in spans if item.kind == kind]
+        if durations:
+            lines.append(f"| {kind} | {len(durations)} | {sum(durations):.1f} | {max(durations):.1f} |")
+
+    llm_spans = [item for item in spans if item.kind == "llm"]
+    if llm_spans:
+        prompt = sum(item.attributes.get("prompt_tokens") or 0 for item in llm_spans)
+        completion = sum(item.attributes.get("completion_tokens") or 0 for item in llm_spans)
+        cached = sum(1 for item in llm_spans if item.attributes.get("cached"))
+        lines += ["", f"**LLM:** {prompt} prompt tokens, {completion} completion tokens, {cached}/{len(llm_spans)} calls served from cache"]
+    sql_spans = [item for item in spans if item.kind == "sql"]
+    if sql_spans:
+        rows = sum(max(item.attributes.get("rows") or 0, 0) for item in sql_spans)
+        lines.append(f"**SQL:** {len(sql_spans)} statements, {rows} rows")
+
+    slowest = sorted((item for item in spans if item.kind not in ("run", "sql")), key=lambda item: item.duration, reverse=True)[:top]
+    if slowest:
+        lines += ["", "**Slowest spans:**"]
+        lines += [f"- {item.kind} `{item.name}`: {item.duration:.1f}s" for item in slowest]
+    return "\n".join(lines)